@@ -0,0 +1,131 @@
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from gui.instruments.partition import find_partitions, load_partition
+from gui.instruments.render import INSTRUMENTS, render_partition, rendered_length, write_wav
+from gui.instruments.synth import Synthesizer
+
+# Synthétiseur propre à chaque processus, pour garder ses tables et filtres en cache
+_synth = None
+
+
+def _init_worker(sample_rate):
+    global _synth
+    _synth = Synthesizer(sample_rate)
+
+
+def _render_job(path, instrument, tempo, octave, shm_name, length, out_path):
+    # Rend directement dans la mémoire partagée préparée par le parent
+    t0 = time.perf_counter()
+    # Le parent crée et détruit le segment ; ici on ne fait que s'y attacher
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        mix = np.ndarray((length,), dtype=np.float32, buffer=shm.buf)
+        render_partition(load_partition(path), instrument, tempo, _synth, octave, out=mix)
+        if out_path:
+            write_wav(out_path, mix, _synth.sample_rate)
+        del mix
+    finally:
+        shm.close()
+    return time.perf_counter() - t0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Rend une bibliothèque de partitions avec chaque instrument, en parallèle.")
+    parser.add_argument("paths", nargs="+", help="partitions ou dossiers de partitions")
+    parser.add_argument("-i", "--instrument", action="append", choices=INSTRUMENTS,
+                        help="instrument à rendre (répétable, tous par défaut)")
+    parser.add_argument("-t", "--tempo", type=float, default=1.0)
+    parser.add_argument("--octave", type=int, choices=(1, 2, 3), default=1)
+    parser.add_argument("--sample-rate", type=int, default=44100)
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(), help="nombre de processus")
+    parser.add_argument("-o", "--out-dir", default="renders", help="dossier de sortie des .wav")
+    parser.add_argument("--no-wav", action="store_true", help="rendre sans écrire de fichiers")
+    args = parser.parse_args(argv)
+
+    instruments = args.instrument or list(INSTRUMENTS)
+    partitions = find_partitions(args.paths)
+    if not args.no_wav:
+        os.makedirs(args.out_dir, exist_ok=True)
+
+    jobs = [(path, instrument) for path in partitions for instrument in instruments]
+    pending = iter(jobs)
+    running = {}
+    start = time.perf_counter()
+    busy = 0.0
+    audio = 0.0
+    failed = []
+
+    def submit(pool):
+        # Un segment de mémoire partagée par rendu, à la taille exacte, créé au lancement
+        for path, instrument in pending:
+            try:
+                length = rendered_length(load_partition(path), args.tempo, args.sample_rate)
+            except (OSError, ValueError, IndexError) as error:
+                # Partition illisible : on la signale et on passe à la suivante
+                failed.append((path, instrument))
+                print(f"{path} [{instrument}] : {error}", file=sys.stderr)
+                continue
+            shm = shared_memory.SharedMemory(create=True, size=max(length, 1) * 4)
+            name = os.path.splitext(os.path.basename(path))[0]
+            out_path = None if args.no_wav else os.path.join(args.out_dir, f"{name}-{instrument}.wav")
+            future = pool.submit(_render_job, path, instrument, args.tempo, args.octave,
+                                 shm.name, length, out_path)
+            running[future] = (path, instrument, length, shm)
+            return True
+        return False
+
+    try:
+        with ProcessPoolExecutor(args.jobs, initializer=_init_worker, initargs=(args.sample_rate,)) as pool:
+            # Quelques rendus d'avance par processus, pas toute la bibliothèque en mémoire
+            while len(running) < 2 * args.jobs and submit(pool):
+                pass
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    path, instrument, length, shm = running.pop(future)
+                    try:
+                        elapsed = future.result()
+                        mix = np.ndarray((length,), dtype=np.float32, buffer=shm.buf)
+                        peak = float(np.abs(mix).max()) if length else 0.0
+                        del mix
+                    except (OSError, ValueError, IndexError) as error:
+                        failed.append((path, instrument))
+                        print(f"{path} [{instrument}] : {error}", file=sys.stderr)
+                        submit(pool)
+                        continue
+                    finally:
+                        shm.close()
+                        shm.unlink()
+                    seconds = length / args.sample_rate
+                    busy += elapsed
+                    audio += seconds
+                    print(f"{path} [{instrument}] {seconds:.1f} s audio, crête {peak:.2f}, "
+                          f"{elapsed * 1000:.0f} ms")
+                    submit(pool)
+    finally:
+        for *_, shm in running.values():
+            shm.close()
+            shm.unlink()
+
+    wall = time.perf_counter() - start
+    rendered = len(jobs) - len(failed)
+    if jobs:
+        print(f"{rendered} rendus en {wall:.2f} s avec {args.jobs} processus : "
+              f"{rendered / wall * 60:.0f} rendus/min, {audio / wall:.0f} s d'audio par seconde, "
+              f"{busy / wall:.1f} rendus en parallèle en moyenne")
+    if failed:
+        print(f"{len(failed)} rendus en échec", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,212 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import timeit
+
+import numpy as np
+
+from gui.instruments.instrument import MusicPlayer
+from gui.instruments.midi import midi_bytes, read_midi
+from gui.instruments.partition import load_partition, parse_partition
+from gui.instruments.pitch import ENGLISH, FREQUENCIES as PITCHES, SOLFEGE
+from gui.instruments.render import INSTRUMENTS
+from gui.instruments.sequencer import Sequencer
+from gui.instruments.sinks import NullSink
+from gui.instruments.synth import QUALITY_MODES, Synthesizer
+
+PARTITIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "partitions")
+
+FREQUENCIES = (110.0, 440.0, 1760.0)
+DURATIONS = (0.1, 0.5, 2.0)
+
+
+def measure(fn, repeat=5, min_seconds=0.05):
+    # Comme timeit : assez d'appels par mesure pour dépasser min_seconds, on garde le minimum
+    timer = timeit.Timer(fn)
+    fn()  # échauffement (tables, filtres, caches)
+    number = 1
+    while timer.timeit(number) < min_seconds and number < 1 << 16:
+        number *= 2
+    runs = np.array(timer.repeat(repeat, number)) / number * 1000
+    return {"ms": float(runs.min()), "median_ms": float(np.median(runs)), "calls": number}
+
+
+def synthetic_lines(count, seed=0):
+    # Partition factice reproductible : notes, silences, durées et commentaires mélangés
+    rng = np.random.default_rng(seed)
+    notes = list(SOLFEGE) + list(ENGLISH) + ["0", "R"]
+    lines = []
+    for i, note in enumerate(rng.choice(notes, count)):
+        if i % 50 == 0:
+            lines.append("# mesure %d\n" % (i // 50))
+        elif i % 7 == 0:
+            lines.append("%s\n" % note)
+        else:
+            lines.append("%s %.3f\n" % (note, rng.uniform(0.05, 1.0)))
+    return lines
+
+
+def bench_synthesis(results, repeat):
+    synth = Synthesizer()
+    for instrument in INSTRUMENTS:
+        for duration in DURATIONS:
+            for frequency in FREQUENCIES:
+                name = "synth/%s/%gHz/%gs" % (instrument, frequency, duration)
+                results[name] = measure(lambda: synth.render_tone(instrument, frequency, duration), repeat)
+
+
+def bench_envelope(results, repeat):
+    synth = Synthesizer()
+    for duration in DURATIONS:
+        num_samples = int(synth.sample_rate * duration)
+        results["envelope/%gs" % duration] = measure(
+            lambda: synth.create_envelope(num_samples, attack_percent=0.01, decay_percent=0.1,
+                                          sustain_level=0.3, release_percent=0.1), repeat)
+
+
+def bench_parsing(results, repeat, synthetic_count):
+    for name in sorted(os.listdir(PARTITIONS_DIR)):
+        if name.endswith(".txt"):
+            with open(os.path.join(PARTITIONS_DIR, name), encoding="utf-8") as f:
+                lines = f.readlines()
+            results["parse/%s" % name] = measure(lambda: parse_partition(lines), repeat)
+    lines = synthetic_lines(synthetic_count)
+    results["parse/synthetic_%d" % synthetic_count] = measure(lambda: parse_partition(lines), repeat)
+    # La même partition en fichier MIDI : lecture des événements, appariement, carte des tempos
+    data = midi_bytes(parse_partition(lines))
+    results["parse/midi_%d" % synthetic_count] = measure(lambda: read_midi(data), repeat)
+
+
+def bench_quality(results, repeat):
+    # Chaque mode de qualité : synthèse d'une touche, et mémoire par note du ToneCache
+    for mode, (sample_rate, output_channels, dtype) in QUALITY_MODES.items():
+        player = MusicPlayer(sample_rate, sink=NullSink(sample_rate, output_channels=output_channels),
+                             dtype=dtype, output_channels=output_channels)
+        for instrument in INSTRUMENTS:
+            results["quality/%s/%s" % (mode, instrument)] = measure(
+                lambda: player.to_samples(player.render_tone(instrument, 440.0, 0.5)), repeat)
+        # Une octave de touches de 0,5 s par instrument, comme au clavier
+        for play in (player.play_piano_tone, player.play_xylophone_tone, player.play_videoGame_tone):
+            for frequency in PITCHES[60:72]:
+                play(float(frequency), 0.5)
+        stats = player.cache.stats()
+        results["quality/%s/bytes_per_note" % mode] = {"bytes": stats["bytes"] / stats["entries"],
+                                                       "entries": stats["entries"]}
+
+
+def bench_drift(results, seconds):
+    # Lecture réelle sur NullSink : le séquenceur tourne au rythme de l'horloge, sans carte son
+    partition = load_partition(os.path.join(PARTITIONS_DIR, "mario.txt"))
+    tempo = partition.length / seconds
+    for instrument in INSTRUMENTS:
+        player = MusicPlayer(sink=NullSink())
+        sequencer = Sequencer(player)
+        sequencer.load(partition, instrument, tempo)
+        sequencer.start()
+        while sequencer.pump():
+            time.sleep(0.005)
+        stats = sequencer.playback_stats()
+        # Le retard mesuré est surtout la phase du sondage toutes les 5 ms : il est affiché,
+        # pas comparé ; les blocs arrivés trop tard (underruns) sont le vrai signal
+        results["drift/%s" % instrument] = {
+            "poll_max_ms": stats["poll_max_ms"],
+            "poll_mean_ms": stats["poll_mean_ms"],
+            "blocks": stats["blocks"],
+            "underruns": stats["underruns"],
+        }
+
+
+def run(repeat=5, synthetic_count=100000, drift_seconds=3.0, only=None):
+    results = {}
+    # Libérer un gros bloc relève le seuil mmap de malloc : sans ça, les suites lancées
+    # seules (--only) paient des défauts de page que la suite complète ne voit pas
+    np.ones(1 << 20).sum()
+    suites = {
+        "synth": lambda: bench_synthesis(results, repeat),
+        "envelope": lambda: bench_envelope(results, repeat),
+        "parse": lambda: bench_parsing(results, repeat, synthetic_count),
+        "quality": lambda: bench_quality(results, repeat),
+        "drift": lambda: bench_drift(results, drift_seconds),
+    }
+    for name, suite in suites.items():
+        if not only or name in only:
+            suite()
+    return {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+
+def _value(result):
+    # Mesure comparée : blocs en retard pour la dérive, un temps en ms, ou des octets pour la mémoire
+    if "underruns" in result:
+        return result["underruns"], "underruns"
+    return (result["ms"], "ms") if "ms" in result else (result["bytes"], "B")
+
+
+def compare(baseline, current, threshold=0.1, min_delta_ms=0.01):
+    # Plus bas est mieux partout. Régression si plus haut de plus de threshold
+    # (et d'au moins min_delta_ms pour un temps, pour ignorer le bruit sur les mesures minuscules)
+    regressions = []
+    rows = []
+    for name, result in current["results"].items():
+        if name not in baseline["results"]:
+            continue
+        new, unit = _value(result)
+        old, _ = _value(baseline["results"][name])
+        ratio = new / old if old else float("inf") if new else 1.0
+        regressed = ratio > 1 + threshold and (unit != "ms" or new - old > min_delta_ms)
+        rows.append((name, old, new, unit, ratio, regressed))
+        if regressed:
+            regressions.append(name)
+    return rows, regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mesure synthèse, enveloppes, lecture de partitions et dérive du séquenceur.")
+    parser.add_argument("-o", "--output", help="fichier JSON où écrire les résultats")
+    parser.add_argument("-c", "--compare", metavar="BASELINE", help="JSON de référence à comparer")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="ralentissement toléré avant de signaler une régression (0.1 = 10 %%)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--synthetic-lines", type=int, default=100000)
+    parser.add_argument("--drift-seconds", type=float, default=3.0,
+                        help="durée de chaque lecture simulée")
+    parser.add_argument("--only", action="append", choices=("synth", "envelope", "parse", "quality", "drift"),
+                        help="suite à lancer (répétable, toutes par défaut)")
+    args = parser.parse_args(argv)
+
+    report = run(args.repeat, args.synthetic_lines, args.drift_seconds, args.only)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if not args.compare:
+        for name, result in report["results"].items():
+            value, unit = _value(result)
+            detail = f"  (sondage max {result['poll_max_ms']:.1f} ms)" if "poll_max_ms" in result else ""
+            print(f"{name:40s} {value:10.3f} {unit}{detail}")
+        return 0
+
+    with open(args.compare, encoding="utf-8") as f:
+        baseline = json.load(f)
+    rows, regressions = compare(baseline, report, args.threshold)
+    for name, old, new, unit, ratio, regressed in rows:
+        flag = "  RÉGRESSION" if regressed else ""
+        print(f"{name:40s} {old:10.3f} -> {new:10.3f} {unit:2s}  x{ratio:5.2f}{flag}")
+    print(f"{len(regressions)} régression(s) au-delà de {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,181 @@
+import bisect
+import time
+
+from PyQt5.QtCore import pyqtSignal, Qt, QRect, QSize, QTimer
+from PyQt5.QtGui import QColor, QPainter, QPen
+from PyQt5.QtWidgets import QWidget
+
+from config import settings
+from gui.instruments.tracing import tracer
+
+# Liseré des touches en relief
+_LIGHT_EDGE = QPen(QColor("#eee"), 2)
+_DARK_EDGE = QPen(QColor("#888"), 2)
+
+
+class KeyStyle:
+    # Couleurs et forme d'une famille de touches, converties une fois en QColor
+
+    __slots__ = ("fill", "down", "text", "radius", "bevel", "shrink")
+
+    def __init__(self, fill, down, text="black", radius=0, bevel=False, shrink=0):
+        self.fill = QColor(fill)
+        self.down = QColor(down)
+        self.text = QColor(text)
+        self.radius = radius
+        self.bevel = bevel    # liseré clair en haut/gauche, sombre en bas/droite
+        self.shrink = shrink  # retrait en pixels quand la touche est enfoncée
+
+
+class RepeatFilter:
+    # Appuis répétés sur une même touche à moins de repeat_ms : une seule note.
+    # Partagé par le clavier peint et les pads du videogame.
+
+    def __init__(self):
+        self.repeat_ms = int(settings.value("repeat_coalesce_ms", 30))
+        self.coalesced = 0
+        self._pressed_at = {}
+
+    def repeated(self, key):
+        # Note l'appui ; True s'il prolonge le précédent (sa trace est alors abandonnée)
+        now = time.perf_counter()
+        last = self._pressed_at.get(key, float("-inf"))
+        self._pressed_at[key] = now
+        if (now - last) * 1000 >= self.repeat_ms:
+            return False
+        self.coalesced += 1
+        tracer.discard()
+        return True
+
+
+class Key:
+    # Une touche peinte : géométrie fixe et état enfoncé.
+    # Répond comme un QPushButton à text(), click() et animateClick().
+
+    __slots__ = ("id", "label", "rect", "style", "down", "_board", "_timer")
+
+    def __init__(self, key_id, label, rect, style):
+        self.id = key_id
+        self.label = label
+        self.rect = rect
+        self.style = style
+        self.down = False
+        self._board = None
+        self._timer = None
+
+    def text(self):
+        return self.label
+
+    def click(self):
+        self._board.activate(self, 0)
+
+    def animateClick(self, msec=100):
+        self._board.activate(self, msec)
+
+
+class KeyboardWidget(QWidget):
+    # Toutes les touches d'un instrument dans un seul widget : table de géométrie
+    # précalculée, recherche par dichotomie au clic, repeinte du seul rectangle modifié.
+    keyPressed = pyqtSignal(object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        # Durée d'affichage de l'appui après un clic souris (ms)
+        self.press_ms = 100
+        self.repeats = RepeatFilter()
+        self._layers = []
+        self._lefts = []
+        self._size = QSize(0, 0)
+
+    def set_keys(self, layers):
+        # layers : listes de Key du fond vers le dessus ; dans une couche, les touches ne se chevauchent pas
+        for layer in self._layers:
+            for key in layer:
+                if key._timer is not None:
+                    key._timer.stop()
+                    key._timer.deleteLater()
+        self._layers = [sorted(layer, key=lambda key: key.rect.left()) for layer in layers]
+        self._lefts = [[key.rect.left() for key in layer] for layer in self._layers]
+        bounds = QRect()
+        for layer in self._layers:
+            for key in layer:
+                key._board = self
+                bounds = bounds.united(key.rect)
+        self._size = QSize(bounds.right() + 1, bounds.bottom() + 1) if layers else QSize(0, 0)
+        self.setFixedSize(self._size)
+        self.updateGeometry()
+        self.update()
+
+    def sizeHint(self):
+        return self._size
+
+    def key_at(self, pos):
+        # Couche du dessus d'abord (touches noires du piano)
+        x = pos.x()
+        for layer, lefts in zip(reversed(self._layers), reversed(self._lefts)):
+            i = bisect.bisect_right(lefts, x) - 1
+            if i >= 0 and layer[i].rect.contains(pos):
+                return layer[i]
+        return None
+
+    def activate(self, key, msec):
+        # Affiche l'appui pendant msec puis prévient l'instrument
+        repeat = self.repeats.repeated(key)
+        if msec:
+            self.set_down(key, True)
+            # Un appui répété relance la même minuterie : l'appui visible est prolongé
+            self._release_timer(key).start(msec)
+        if repeat:
+            return
+        self.keyPressed.emit(key.id)
+
+    def _release_timer(self, key):
+        # Une minuterie par touche, créée au premier appui puis réutilisée
+        if key._timer is None:
+            key._timer = QTimer(self)
+            key._timer.setSingleShot(True)
+            key._timer.timeout.connect(lambda: self.set_down(key, False))
+        return key._timer
+
+    def set_down(self, key, down):
+        if key.down != down:
+            key.down = down
+            self.update(key.rect)
+
+    def mousePressEvent(self, event):
+        key = self.key_at(event.pos()) if event.button() == Qt.LeftButton else None
+        if key is None:
+            super().mousePressEvent(event)
+            return
+        self.activate(key, self.press_ms)
+
+    def paintEvent(self, event):
+        dirty = event.rect()
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing)
+        for layer in self._layers:
+            for key in layer:
+                if key.rect.intersects(dirty):
+                    self._paint_key(painter, key)
+
+    @staticmethod
+    def _paint_key(painter, key):
+        style = key.style
+        rect = key.rect
+        if key.down and style.shrink:
+            rect = rect.adjusted(style.shrink, style.shrink, -style.shrink, -style.shrink)
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(style.down if key.down else style.fill)
+        if style.radius:
+            painter.drawRoundedRect(rect, style.radius, style.radius)
+        else:
+            painter.drawRect(rect)
+        if style.bevel:
+            painter.setPen(_LIGHT_EDGE)
+            painter.drawLine(rect.topLeft(), rect.topRight())
+            painter.drawLine(rect.topLeft(), rect.bottomLeft())
+            painter.setPen(_DARK_EDGE)
+            painter.drawLine(rect.bottomLeft(), rect.bottomRight())
+            painter.drawLine(rect.topRight(), rect.bottomRight())
+        painter.setPen(style.text)
+        painter.drawText(rect.adjusted(0, 0, 0, -8), Qt.AlignHCenter | Qt.AlignBottom, key.label)
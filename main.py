@@ -7,15 +7,39 @@ from PyQt5.QtGui import QIcon, QKeySequence
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QAction, QFileDialog, QToolBar,
     QSpinBox, QDoubleSpinBox, QPushButton, QButtonGroup, QVBoxLayout,
-    QHBoxLayout, QLayout, QStackedWidget
+    QHBoxLayout, QLayout, QStackedWidget, QLabel, QSlider
 )
 
-from gui.instruments.instrument import note_to_frequency
+from gui.instruments.instrument import shared_player
+from gui.instruments.metrics import LatencyHistogram, object_counts
+from gui.instruments.partition import load_partition
 from gui.instruments.piano import Piano
+from gui.instruments.recorder import Recorder
+from gui.instruments.sample_bank import SampleBank, SampleBankWorker
+from gui.instruments.sequencer import Sequencer
+from gui.instruments.sinks import PygameSink
+from gui.instruments.startup import WarmUpWorker, startup_profile, warm_up
+from gui.instruments.synth import INSTRUMENTS
+from gui.instruments.tracing import tracer
 from gui.instruments.videogame import VideoGame
 from gui.instruments.xylophone import Xylophone
 
 
+# Keyboard layouts: one mapping per piano octave
+PIANO_KEYS = [
+    {Qt.Key_A: 'Do', Qt.Key_S: 'Ré', Qt.Key_D: 'Mi', Qt.Key_F: 'Fa', Qt.Key_G: 'Sol', Qt.Key_H: 'La',
+     Qt.Key_J: 'Si'},
+    {Qt.Key_Q: 'Do', Qt.Key_W: 'Ré', Qt.Key_E: 'Mi', Qt.Key_R: 'Fa', Qt.Key_T: 'Sol', Qt.Key_Y: 'La',
+     Qt.Key_U: 'Si'},
+    {Qt.Key_1: 'Do', Qt.Key_2: 'Ré', Qt.Key_3: 'Mi', Qt.Key_4: 'Fa', Qt.Key_5: 'Sol', Qt.Key_6: 'La',
+     Qt.Key_7: 'Si'},
+]
+XYLOPHONE_KEYS = {Qt.Key_A: 'Do', Qt.Key_S: 'Ré', Qt.Key_D: 'Mi', Qt.Key_F: 'Fa', Qt.Key_G: 'Sol', Qt.Key_H: 'La',
+                  Qt.Key_J: 'Si'}
+VIDEOGAME_KEYS = {Qt.Key_1: 0, Qt.Key_2: 1, Qt.Key_3: 2, Qt.Key_4: 3, Qt.Key_5: 4, Qt.Key_6: 5, Qt.Key_7: 6,
+                  Qt.Key_8: 7, Qt.Key_9: 8, Qt.Key_0: 9}
+
+
 class DynamicStackedWidget(QStackedWidget):
     def sizeHint(self):
         current = self.currentWidget()
@@ -28,8 +52,11 @@ class DynamicStackedWidget(QStackedWidget):
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
+        startup_profile.mark("window_init")
         self.setWindowTitle("Projet")
         self.settings = QSettings("IHM", "ProjetFinal")
+        self.player = shared_player()
+        self.sequencer = Sequencer(self.player)
 
         # Fixed click durations
         self.click_durations = {
@@ -41,8 +68,20 @@ class MainWindow(QMainWindow):
         # State flags
         self.recording = False
         self.playing = False
-        self.record_events = []
+        self.recorder = None
+
+        # Keypress-to-sound latency
+        self.key_latency = LatencyHistogram()
+        self._key_pressed_at = None
         self.tempo_factor = 1.0
+        self.bank = None
+        self._bank_worker = None
+        self._bank_pending = False
+
+        # Feeds the sequencer's look-ahead buffer
+        self.sequence_timer = QTimer(self)
+        self.sequence_timer.setInterval(20)
+        self.sequence_timer.timeout.connect(self._pump_sequence)
 
         # UI setup
         self._create_actions()
@@ -50,9 +89,23 @@ class MainWindow(QMainWindow):
         self._create_toolbar()
         self._create_central_widget()
         self._load_settings()
+        self._init_sample_bank()
+        self._init_tracing()
+
+        # Keyboard-to-sound latency, updated after each note played from the keyboard
+        self.latency_label = QLabel()
+        self.statusBar().addPermanentWidget(self.latency_label)
 
         # Disable Stop until needed
         self.stopAction.setEnabled(False)
+        self._set_playback_enabled(False)
+
+        # scipy, pygame and the mixer: before showing ("eager") or after the first paint (default)
+        self._warm_worker = None
+        if self.settings.value('startup', 'deferred') == 'eager':
+            warm_up(self.player, startup_profile, self._warm_up_modules(), self._warm_up_frequencies())
+            self._audio_ready()
+        startup_profile.mark("window_ready")
 
     def _create_actions(self):
         self.openAction = QAction(QIcon("icons/open.png"), "Ouvrir", self)
@@ -67,16 +120,45 @@ class MainWindow(QMainWindow):
         self.stopAction.triggered.connect(self.stop_all)
         self.stopAction.setShortcut(QKeySequence("Ctrl+T"))
 
+        # Partition playback: pause, A-B loop, one bar back/forward
+        self.pauseAction = QAction("Pause", self)
+        self.pauseAction.setCheckable(True)
+        self.pauseAction.toggled.connect(self.toggle_pause)
+        self.pauseAction.setShortcut(QKeySequence("Ctrl+P"))
+
+        self.loopAction = QAction("Boucle A–B", self)
+        self.loopAction.triggered.connect(self.mark_loop)
+        self.loopAction.setShortcut(QKeySequence("Ctrl+L"))
+
+        self.prevBarAction = QAction("Mesure précédente", self)
+        self.prevBarAction.triggered.connect(lambda: self.jump_bars(-1))
+        self.prevBarAction.setShortcut(QKeySequence(Qt.Key_PageUp))
+
+        self.nextBarAction = QAction("Mesure suivante", self)
+        self.nextBarAction.triggered.connect(lambda: self.jump_bars(1))
+        self.nextBarAction.setShortcut(QKeySequence(Qt.Key_PageDown))
+        self._loop_start = None
+
         self.quitAction = QAction(QIcon("icons/quit.png"), "Quitter", self)
-        self.quitAction.triggered.connect(QApplication.instance().quit)
+        # Through closeEvent, so the recorder and the audio sink are flushed before exiting
+        self.quitAction.triggered.connect(self.close)
         self.quitAction.setShortcut(QKeySequence("Ctrl+Q"))
 
+        self.exportTraceAction = QAction("Exporter la trace des notes…", self)
+        self.exportTraceAction.triggered.connect(self.export_trace)
+
     def _create_menu(self):
         file_menu = self.menuBar().addMenu("Fichier")
         file_menu.addAction(self.openAction)
         file_menu.addAction(self.recordAction)
         file_menu.addAction(self.stopAction)
         file_menu.addSeparator()
+        for action in self.playback_actions():
+            file_menu.addAction(action)
+        file_menu.addSeparator()
+        if tracer.enabled:
+            file_menu.addAction(self.exportTraceAction)
+            file_menu.addSeparator()
         file_menu.addAction(self.quitAction)
 
     def _create_toolbar(self):
@@ -85,6 +167,17 @@ class MainWindow(QMainWindow):
         toolbar.addAction(self.openAction)
         toolbar.addAction(self.recordAction)
         toolbar.addAction(self.stopAction)
+        toolbar.addAction(self.pauseAction)
+        toolbar.addAction(self.loopAction)
+
+        # Playback position in ms; dragging seeks on release, clicks and keys seek at once
+        self.position_slider = QSlider(Qt.Horizontal)
+        self.position_slider.setFixedWidth(160)
+        self.position_slider.setRange(0, 0)
+        self.position_slider.sliderReleased.connect(
+            lambda: self.sequencer.seek(self.position_slider.value() / 1000))
+        self.position_slider.actionTriggered.connect(self._slider_action)
+        toolbar.addWidget(self.position_slider)
         toolbar.addSeparator()
 
         self.spin_octaves = QSpinBox()
@@ -118,11 +211,13 @@ class MainWindow(QMainWindow):
         layout.addLayout(btn_layout)
 
         self.stack = DynamicStackedWidget()
-        self.piano = Piano(octaves=self.spin_octaves.value())
-        self.xylophone = Xylophone()
-        self.videogame = VideoGame()
+        self.piano = Piano(octaves=self.spin_octaves.value(), player=self.player)
+        self.xylophone = Xylophone(player=self.player)
+        self.videogame = VideoGame(player=self.player)
         for widget in (self.piano, self.xylophone, self.videogame):
             self.stack.addWidget(widget)
+            widget.notePlayed.connect(self._note_sounded)
+        self._build_key_dispatch()
         layout.addWidget(self.stack)
 
         central.setLayout(layout)
@@ -136,62 +231,217 @@ class MainWindow(QMainWindow):
         self.btn_group.button(instrument).setChecked(True)
         self.switch_instrument(instrument)
 
+    # Note tracing (opt-in: trace_notes setting or IHM_TRACE=1)
+    def _init_tracing(self):
+        if not tracer.enabled:
+            return
+        self.trace_label = QLabel()
+        self.statusBar().addPermanentWidget(self.trace_label)
+        self.trace_timer = QTimer(self)
+        self.trace_timer.setInterval(500)
+        self.trace_timer.timeout.connect(self._show_trace_stats)
+        self.trace_timer.start()
+
+    def _show_trace_stats(self):
+        stats = tracer.percentiles()
+        total = stats.pop("total", None)
+        # Live Qt objects should stay flat however long the session
+        objects = f"objets Qt {object_counts(self)['qobjects']}"
+        if total is None:
+            self.trace_label.setText(f"Latence : — · {objects}")
+            return
+        # The slowest stage at p90 is the one worth looking at
+        slowest = max(stats, key=lambda stage: stats[stage]["p90"])
+        self.trace_label.setText(
+            f"Latence p50 {total['p50']:.1f} ms · p90 {total['p90']:.1f} ms · p99 {total['p99']:.1f} ms"
+            f" · {slowest} {stats[slowest]['p90']:.1f} ms · {objects}"
+        )
+
+    def export_trace(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Exporter la trace", "notes.trace.json",
+                                              "Trace Chrome (*.json)")
+        if path:
+            count = tracer.export_chrome_trace(path)
+            self.statusBar().showMessage(f"{count} notes exportées vers {path}", 3000)
+
+    # Startup
+    def _warm_up_modules(self):
+        return ["scipy.signal"] + (["pygame"] if isinstance(self.player.sink, PygameSink) else [])
+
+    def _warm_up_frequencies(self):
+        return [freq for _, freq, _ in self.xylophone.playable_tones()]
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if "first_paint" not in startup_profile.marks:
+            startup_profile.mark("first_paint")
+            if "audio_ready" not in startup_profile.marks:
+                QTimer.singleShot(0, self._start_warm_up)
+
+    def _start_warm_up(self):
+        self._warm_worker = WarmUpWorker(self.player, startup_profile, self._warm_up_modules(),
+                                         self._warm_up_frequencies(), self)
+        self._warm_worker.finished.connect(self._audio_ready)
+        self._warm_worker.start()
+
+    def _audio_ready(self):
+        # Opening the mixer stays in the GUI thread; the imports are already done
+        self.player.sink.open()
+        startup_profile.mark("audio_ready")
+
+    # Sample bank
+    def _init_sample_bank(self):
+        if not self.settings.value('sample_bank', False, type=bool):
+            return
+        path = self.settings.value('sample_bank_path', 'sample_bank.npz')
+        bank_format = (self.player.output_channels, self.player.sample_rate, self.player.dtype)
+        try:
+            self.bank = SampleBank.load(path) if os.path.exists(path) else SampleBank(path, *bank_format)
+        except (OSError, ValueError, KeyError):
+            self.bank = SampleBank(path, *bank_format)
+        if not self.bank.matches(self.player):
+            # Bank saved in another quality mode (rate, precision or channels): start over
+            self.bank = SampleBank(path, *bank_format)
+        self.player.bank = self.bank
+        self._warm_sample_bank()
+
+    def _warm_sample_bank(self):
+        if self.bank is None:
+            return
+        if self._bank_worker is not None and self._bank_worker.isRunning():
+            self._bank_pending = True
+            return
+        keys = [self.player.tone_key(*tone)
+                for widget in (self.piano, self.xylophone, self.videogame)
+                for tone in widget.playable_tones()]
+        self._bank_worker = SampleBankWorker(self.bank, self.player, keys, self)
+        self._bank_worker.progress.connect(self._show_bank_progress)
+        self._bank_worker.finished.connect(self._sample_bank_ready)
+        self._bank_worker.start()
+
+    def _show_bank_progress(self, done, total):
+        if total:
+            self.statusBar().showMessage(f"Banque de sons : {done}/{total}")
+
+    def _sample_bank_ready(self):
+        self.statusBar().showMessage(f"Banque de sons prête ({len(self.bank)} notes)", 3000)
+        if self._bank_pending:
+            self._bank_pending = False
+            self._warm_sample_bank()
+
     # Partition playback
     def open_partition(self):
         start_dir = "partitions" if os.path.isdir("partitions") else ""
-        path, _ = QFileDialog.getOpenFileName(self, "Ouvrir partition", start_dir, "Text Files (*.txt)")
+        path, _ = QFileDialog.getOpenFileName(self, "Ouvrir partition", start_dir,
+                                              "Partitions (*.txt *.ihmp *.mid *.midi)")
         if not path:
             return
-        sequence = []
-        with open(path) as f:
-            for line in f:
-                text = line.strip()
-                if not text:
-                    continue
-                parts = text.split()
-                note = parts[0]
-                duration = float(parts[1]) if len(parts) > 1 else self.click_durations['piano']
-                sequence.append((note, duration))
+        try:
+            partition = load_partition(path, self.click_durations['piano'])
+        except (OSError, ValueError) as error:
+            # Unreadable or malformed file: report it and keep the current state
+            self.statusBar().showMessage(f"Impossible d'ouvrir {os.path.basename(path)} : {error}", 5000)
+            return
         self.playing = True
         self.recordAction.setEnabled(False)
         self.stopAction.setEnabled(True)
-        self.play_sequence(sequence, 0)
+        self._set_playback_enabled(True)
+        self.play_sequence(partition)
 
-    def play_sequence(self, sequence, index):
-        if not self.playing or index >= len(sequence):
-            self.playing = False
-            self.openAction.setEnabled(True)
-            self.stopAction.setEnabled(False)
-            self.recordAction.setEnabled(True)
-            return
-        note, duration = sequence[index]
-        duration /= self.tempo_factor
+    def play_sequence(self, partition):
         current = self.stack.currentIndex()
-        freq = None
-        if note != '0':
-            freqs = note_to_frequency.get(note)
-            if isinstance(freqs, int):
-                freq = freqs
-            elif freqs:
-                freq = freqs[self.piano.octaves - 1] if current == 0 else freqs[0]
-        if freq is not None:
-            if current == 0:
-                self.piano.player.play_piano_tone(freq, duration)
-            elif current == 1:
-                self.xylophone.player.play_xylophone_tone(freq, duration)
+        instrument = INSTRUMENTS[current]
+        octave = self.piano.octaves if current == 0 else 1
+        bar_seconds = float(self.settings.value('bar_seconds', 1.0))
+        self.sequencer.load(partition, instrument, self.tempo_factor, octave, bar_seconds)
+        self.position_slider.setRange(0, int(self.sequencer.duration * 1000))
+        # A click in the groove moves by one bar, like Page Up / Page Down
+        self.position_slider.setPageStep(max(int(self.sequencer.bar_length / self.player.sample_rate * 1000), 1))
+        self.sequencer.start()
+        self.sequence_timer.start()
+
+    def _pump_sequence(self):
+        if self.playing and self.sequencer.pump():
+            if not self.position_slider.isSliderDown():
+                self.position_slider.setValue(int(self.sequencer.position * 1000))
+            return
+        self.sequence_timer.stop()
+        self.sequencer.stop()
+        self.sequencer.clear_loop()
+        self.playing = False
+        self.openAction.setEnabled(True)
+        self.stopAction.setEnabled(False)
+        self.recordAction.setEnabled(True)
+        self._set_playback_enabled(False)
+        self.position_slider.setValue(0)
+        stats = self.sequencer.playback_stats()
+        # Underruns are the audible problem; poll latency only says how late the timer ran
+        self.statusBar().showMessage(
+            f"Lecture terminée : {stats['underruns']} bloc(s) en retard, "
+            f"sondage max {stats['poll_max_ms']:.0f} ms", 3000)
+
+    def playback_actions(self):
+        return [self.pauseAction, self.loopAction, self.prevBarAction, self.nextBarAction]
+
+    def _set_playback_enabled(self, enabled):
+        for action in self.playback_actions():
+            action.setEnabled(enabled)
+        self.position_slider.setEnabled(enabled)
+        self.pauseAction.setChecked(False)
+        self._loop_start = None
+        self.loopAction.setText("Boucle A–B")
+
+    def toggle_pause(self, paused):
+        if not self.playing:
+            return
+        if paused:
+            self.sequence_timer.stop()
+            self.sequencer.pause()
+        else:
+            self.sequencer.resume()
+            self.sequence_timer.start()
+
+    def mark_loop(self):
+        # First press marks A, second marks B and starts looping, third clears the loop
+        position = self.sequencer.position
+        if self.sequencer.loop is not None:
+            self.sequencer.clear_loop()
+            self.loopAction.setText("Boucle A–B")
+            self.statusBar().showMessage("Boucle retirée", 2000)
+        elif self._loop_start is None:
+            self._loop_start = position
+            self.loopAction.setText("Boucle : marquer B")
+            self.statusBar().showMessage(f"A = {position:.2f} s", 2000)
+        else:
+            self.sequencer.set_loop(self._loop_start, position)
+            self._loop_start = None
+            if self.sequencer.loop is not None:
+                a, b = self.sequencer.loop
+                self.loopAction.setText("Retirer la boucle")
+                self.statusBar().showMessage(f"Boucle {a:.2f} s – {b:.2f} s", 2000)
             else:
-                self.videogame.player.play_videoGame_tone(freq, duration)
-        QTimer.singleShot(int(duration * 1000), lambda: self.play_sequence(sequence, index + 1))
+                self.loopAction.setText("Boucle A–B")
+
+    def _slider_action(self, action):
+        # sliderPosition already holds the target; a drag waits for the release
+        if action != QSlider.SliderMove:
+            self.sequencer.seek(self.position_slider.sliderPosition() / 1000)
+
+    def jump_bars(self, step):
+        bar = max(self.sequencer.bar_at() + step, 0)
+        self.sequencer.seek_bar(bar)
+        self.position_slider.setValue(int(self.sequencer.position * 1000))
+        self.statusBar().showMessage(f"Mesure {bar + 1}", 1500)
 
     # Recording
     def start_recording(self):
         if self.recording or self.playing:
             return
-        path, _ = QFileDialog.getSaveFileName(self, "Enregistrer morceau", "", "Text Files (*.txt)")
+        path, _ = QFileDialog.getSaveFileName(self, "Enregistrer morceau", "",
+                                              "Text Files (*.txt);;Partition binaire (*.ihmp)")
         if not path:
             return
-        self.record_events.clear()
-        self.record_path = path
+        self.recorder = Recorder(path)
         self.recording = True
         for widget in (self.piano, self.xylophone, self.videogame):
             widget.notePlayed.connect(self._capture_event)
@@ -201,71 +451,66 @@ class MainWindow(QMainWindow):
 
     def _capture_event(self, note, timestamp):
         if self.recording:
-            self.record_events.append((note, timestamp, self.stack.currentIndex()))
+            click = self.click_durations[INSTRUMENTS[self.stack.currentIndex()]]
+            self.recorder.record(note, timestamp, click)
 
     def stop_all(self):
         if self.recording:
             for widget in (self.piano, self.xylophone, self.videogame):
                 widget.notePlayed.disconnect(self._capture_event)
-            with open(self.record_path, 'w') as f:
-                prev_time = self.record_events[0][1] if self.record_events else time.time()
-                for note, t, inst in self.record_events:
-                    delta = t - prev_time
-                    click = self.click_durations[['piano', 'xylophone', 'videogame'][inst]]
-                    if delta > click:
-                        f.write(f"0 {delta - click:.4f}\n")
-                    f.write(f"{note} {click:.4f}\n")
-                    prev_time = t
+            self.recorder.close()
+            self.recorder = None
             self.recording = False
-            self.record_events.clear()
             self.recordAction.setEnabled(True)
             self.openAction.setEnabled(True)
         if self.playing:
             self.playing = False
+            self.player.stop()
+            # A paused sequence has no timer running to notice the stop
+            self._pump_sequence()
 
     # Keys
-    def keyPressEvent(self, event):
-        key = event.key()
-        current = self.stack.currentIndex()
+    def _build_key_dispatch(self):
+        # Qt key -> (button, animation ms), per instrument;
+        # rebuilt only when the piano layout changes
+        piano = {}
+        for oct_idx, mapping in enumerate(PIANO_KEYS[:self.piano.octaves]):
+            for key, note in mapping.items():
+                button = self.piano.key_buttons.get((note, oct_idx))
+                if button is not None:
+                    piano[key] = (button, self.piano.anim_dur)
+        xylophone = {
+            key: (self.xylophone.bar_buttons[note], self.xylophone.anim_duration)
+            for key, note in XYLOPHONE_KEYS.items() if note in self.xylophone.bar_buttons
+        }
+        videogame = {
+            key: (self.videogame.pad_buttons[idx], self.videogame.anim_duration)
+            for key, idx in VIDEOGAME_KEYS.items() if idx < len(self.videogame.pad_buttons)
+        }
+        self.key_dispatch = [piano, xylophone, videogame]
 
-        if current == 0:
-            octave_maps = [
-                {Qt.Key_A: 'Do', Qt.Key_S: 'Ré', Qt.Key_D: 'Mi', Qt.Key_F: 'Fa', Qt.Key_G: 'Sol', Qt.Key_H: 'La',
-                 Qt.Key_J: 'Si'},
-                {Qt.Key_Q: 'Do', Qt.Key_W: 'Ré', Qt.Key_E: 'Mi', Qt.Key_R: 'Fa', Qt.Key_T: 'Sol', Qt.Key_Y: 'La',
-                 Qt.Key_U: 'Si'},
-                {Qt.Key_1: 'Do', Qt.Key_2: 'Ré', Qt.Key_3: 'Mi', Qt.Key_4: 'Fa', Qt.Key_5: 'Sol', Qt.Key_6: 'La',
-                 Qt.Key_7: 'Si'},
-            ]
-            for idx, mapping in enumerate(octave_maps):
-                if key in mapping and idx < self.spin_octaves.value():
-                    note = mapping[key]
-                    buttons = [b for b in self.piano.findChildren(QPushButton) if b.text() == note]
-                    if len(buttons) > idx:
-                        buttons[idx].animateClick(self.piano.anim_dur)
-                    return
-
-        if current == 1:
-            mapping = {Qt.Key_A: 'Do', Qt.Key_S: 'Ré', Qt.Key_D: 'Mi', Qt.Key_F: 'Fa', Qt.Key_G: 'Sol', Qt.Key_H: 'La',
-                       Qt.Key_J: 'Si'}
-            if key in mapping:
-                note = mapping[key]
-                buttons = [b for b in self.xylophone.findChildren(QPushButton) if b.text() == note]
-                if buttons:
-                    buttons[0].animateClick(self.xylophone.anim_duration)
-                return
-
-        if current == 2:
-            vg_map = {Qt.Key_1: 0, Qt.Key_2: 1, Qt.Key_3: 2, Qt.Key_4: 3, Qt.Key_5: 4, Qt.Key_6: 5, Qt.Key_7: 6,
-                      Qt.Key_8: 7, Qt.Key_9: 8, Qt.Key_0: 9}
-            if key in vg_map:
-                idx = vg_map[key]
-                buttons = self.videogame.findChildren(QPushButton)
-                if idx < len(buttons):
-                    buttons[idx].animateClick(self.videogame.anim_duration)
-                return
-
-        super().keyPressEvent(event)
+    def keyPressEvent(self, event):
+        entry = self.key_dispatch[self.stack.currentIndex()].get(event.key())
+        if entry is None:
+            super().keyPressEvent(event)
+            return
+        if event.isAutoRepeat():
+            # A held key plays once
+            return
+        button, anim_duration = entry
+        self._key_pressed_at = time.perf_counter()
+        tracer.begin(button.text())
+        button.animateClick(anim_duration)
+
+    def _note_sounded(self, note, timestamp):
+        startup_profile.mark("first_note")
+        if self._key_pressed_at is not None:
+            self.key_latency.record(time.perf_counter() - self._key_pressed_at)
+            self._key_pressed_at = None
+            summary = self.key_latency.summary()
+            self.latency_label.setText(
+                f"Touche → son p50 {summary['p50_ms']:.0f} ms · p90 {summary['p90_ms']:.0f} ms"
+                f" ({summary['count']} notes)")
 
     def switch_instrument(self, idx):
         self.stack.setCurrentIndex(idx)
@@ -279,15 +524,30 @@ class MainWindow(QMainWindow):
 
     def change_octaves(self, value):
         self.piano.setOctaves(value)
+        self._build_key_dispatch()
         self.settings.setValue('octaves', value)
+        self._warm_sample_bank()
         self.switch_instrument(self.stack.currentIndex())
 
     def closeEvent(self, event):
+        if self.recording or self.playing:
+            self.stop_all()
+        if self._bank_worker is not None:
+            self._bank_worker.wait()
+        if self._warm_worker is not None:
+            self._warm_worker.wait()
+        # Stops the streaming thread and lets the wav sink write its file
+        self.player.close()
         self.settings.sync()
+        # IHM_STARTUP_PROFILE=startup.json (or "-" for stderr): time-to-first-paint / first-note report
+        profile_path = os.environ.get('IHM_STARTUP_PROFILE')
+        if profile_path:
+            startup_profile.write(profile_path)
         super().closeEvent(event)
 
 
 if __name__ == '__main__':
+    startup_profile.mark("imports_done")
     app = QApplication(sys.argv)
     window = MainWindow()
     window.show()
@@ -0,0 +1,64 @@
+import bisect
+import gc
+import math
+
+from PyQt5.QtCore import QAbstractAnimation, QObject, QTimer
+
+
+class LatencyHistogram:
+    # Histogramme de latences à seaux logarithmiques (10 µs à 10 s par défaut)
+
+    def __init__(self, min_seconds=1e-5, max_seconds=10.0, buckets_per_decade=20):
+        decades = math.log10(max_seconds / min_seconds)
+        n = int(math.ceil(decades * buckets_per_decade))
+        self.edges = [min_seconds * 10 ** (i / buckets_per_decade) for i in range(n + 1)]
+        # counts[0] : sous le minimum, counts[-1] : au-delà du maximum
+        self.counts = [0] * (n + 2)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        self.counts[bisect.bisect_right(self.edges, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, p):
+        # Borne haute du seau qui contient le p-ième centile
+        if not self.count:
+            return 0.0
+        target = self.count * p / 100
+        seen = 0
+        for idx, n in enumerate(self.counts):
+            seen += n
+            if seen >= target and n:
+                return min(self.edges[min(idx, len(self.edges) - 1)], self.max)
+        return self.max
+
+    def reset(self):
+        self.counts = [0] * len(self.counts)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean_ms": self.total / self.count * 1000 if self.count else 0.0,
+            "p50_ms": self.percentile(50) * 1000,
+            "p90_ms": self.percentile(90) * 1000,
+            "p99_ms": self.percentile(99) * 1000,
+            "max_ms": self.max * 1000,
+        }
+
+
+def object_counts(root):
+    # Objets vivants sous root (dont animations et minuteries) et objets Python suivis par le GC :
+    # doivent rester stables sur une longue session
+    return {
+        "qobjects": len(root.findChildren(QObject)),
+        "animations": len(root.findChildren(QAbstractAnimation)),
+        "timers": len(root.findChildren(QTimer)),
+        "python": len(gc.get_objects()),
+    }
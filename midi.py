@@ -0,0 +1,344 @@
+import argparse
+import os
+import struct
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from gui.instruments.partition import (
+    BINARY_EXT, MIDI_EXTS, Partition, PartitionWriter, find_partitions, load_partition, save_binary,
+)
+from gui.instruments.pitch import NOTE_NAMES, REST, note_indices
+
+# Fichier MIDI standard (SMF) : en-tête MThd, puis un bloc MTrk par piste
+_CHUNK = struct.Struct(">4sI")
+_HEADER = struct.Struct(">HHH")  # format, nombre de pistes, division
+
+# Tempo par défaut du format : 120 noires par minute, en µs par noire
+DEFAULT_TEMPO = 500000
+
+# Canal 10 (9 en partant de 0) : percussions, sans hauteur de note
+DRUM_CHANNEL = 9
+
+# Octets de données de chaque message de canal, par quartet de statut
+_DATA_BYTES = {0x80: 2, 0x90: 2, 0xA0: 2, 0xB0: 2, 0xC0: 1, 0xD0: 1, 0xE0: 2}
+
+
+class Events:
+    # Événements de note de tout un fichier, en tableaux parallèles
+
+    def __init__(self, ticks, tracks, channels, keys, on, tempo_ticks, tempos, division, end_tick):
+        self.ticks = ticks          # position absolue en ticks
+        self.tracks = tracks
+        self.channels = channels
+        self.keys = keys            # numéro MIDI
+        self.on = on                # note-on de vélocité non nulle
+        self.tempo_ticks = tempo_ticks
+        self.tempos = tempos        # µs par noire à partir de tempo_ticks
+        self.division = division
+        self.end_tick = end_tick    # dernière fin de piste
+
+    def seconds(self, ticks):
+        # Ticks -> secondes à travers la carte des tempos
+        ticks = np.asarray(ticks, dtype=np.int64)
+        if self.division & 0x8000:
+            # Division SMPTE : images par seconde × ticks par image, sans tempo
+            fps = 256 - (self.division >> 8)
+            return ticks / float(fps * (self.division & 0xFF))
+        tempo_ticks, tempos = self.tempo_ticks, self.tempos
+        if not len(tempo_ticks) or tempo_ticks[0] > 0:
+            tempo_ticks = np.append(0, tempo_ticks)
+            tempos = np.append(DEFAULT_TEMPO, tempos)
+        scale = tempos / (self.division * 1e6)
+        # Secondes écoulées au début de chaque segment de tempo
+        offsets = np.zeros(len(tempo_ticks))
+        np.cumsum(np.diff(tempo_ticks) * scale[:-1], out=offsets[1:])
+        segment = np.searchsorted(tempo_ticks, ticks, side="right") - 1
+        return offsets[segment] + (ticks - tempo_ticks[segment]) * scale[segment]
+
+
+def _read_vlq(data, pos):
+    value = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value = (value << 7) | (byte & 0x7F)
+        if not byte & 0x80:
+            return value, pos
+
+
+def read_events(data):
+    try:
+        return _read_events(bytes(data))
+    except (struct.error, IndexError):
+        # En-tête, bloc ou événement coupé en fin de fichier
+        raise ValueError("fichier MIDI tronqué") from None
+
+
+def _read_events(data):
+    # Une seule passe Python par piste pour suivre le statut courant et les longueurs
+    # variables ; tout le reste est fait en NumPy sur les tableaux obtenus
+    tag, size = _CHUNK.unpack_from(data, 0)
+    if tag != b"MThd" or size < _HEADER.size:
+        raise ValueError("ce n'est pas un fichier MIDI standard")
+    _, num_tracks, division = _HEADER.unpack_from(data, _CHUNK.size)
+    if not division:
+        raise ValueError("division MIDI nulle")
+
+    ticks, tracks, codes = [], [], []
+    tempo_ticks, tempos = [], []
+    end_tick = 0
+    pos = _CHUNK.size + size
+    track = 0
+    while track < num_tracks and pos + _CHUNK.size <= len(data):
+        tag, size = _CHUNK.unpack_from(data, pos)
+        pos += _CHUNK.size
+        end = min(pos + size, len(data))
+        if tag != b"MTrk":
+            # Bloc inconnu : le format demande de l'ignorer
+            pos = end
+            continue
+        tick = 0
+        status = 0
+        add_tick, add_code = ticks.append, codes.append
+        first = len(ticks)
+        while pos < end:
+            delta, pos = _read_vlq(data, pos)
+            tick += delta
+            byte = data[pos]
+            if byte & 0x80:
+                status = byte
+                pos += 1
+            elif not status:
+                raise ValueError("octet de données sans statut à l'octet %d" % pos)
+            kind = status & 0xF0
+            if kind == 0x90 or kind == 0x80:
+                # Code : canal, note, note-on (vélocité non nulle)
+                on = kind == 0x90 and data[pos + 1] > 0
+                add_tick(tick)
+                add_code((status & 0x0F) << 8 | data[pos] << 1 | on)
+                pos += 2
+            elif kind != 0xF0:
+                pos += _DATA_BYTES[kind]
+            elif status == 0xFF:
+                meta = data[pos]
+                length, pos = _read_vlq(data, pos + 1)
+                if meta == 0x51 and length == 3:
+                    tempo_ticks.append(tick)
+                    tempos.append(int.from_bytes(data[pos:pos + 3], "big"))
+                pos += length
+                status = 0
+                if meta == 0x2F:
+                    break
+            elif status == 0xF0 or status == 0xF7:
+                length, pos = _read_vlq(data, pos)
+                pos += length
+                status = 0
+            else:
+                raise ValueError("message système 0x%02X inattendu dans une piste" % status)
+        tracks.extend([track] * (len(ticks) - first))
+        end_tick = max(end_tick, tick)
+        pos = end
+        track += 1
+
+    codes = np.array(codes, dtype=np.int32)
+    tempo_ticks = np.array(tempo_ticks, dtype=np.int64)
+    tempos = np.array(tempos, dtype=np.float64)
+    # Changements de tempo de toutes les pistes, dans l'ordre ; au même tick, le dernier l'emporte
+    order = np.argsort(tempo_ticks, kind="stable")
+    tempo_ticks, tempos = tempo_ticks[order], tempos[order]
+    # Sans événement de tempo (permis : 120 noires par minute), seconds() prend DEFAULT_TEMPO
+    last = np.append(tempo_ticks[1:] != tempo_ticks[:-1], True) if len(tempo_ticks) else np.ones(0, dtype=bool)
+    return Events(
+        np.array(ticks, dtype=np.int64), np.array(tracks, dtype=np.int32),
+        codes >> 8, (codes >> 1) & 0x7F, (codes & 1).astype(bool),
+        tempo_ticks[last], tempos[last], division, end_tick,
+    )
+
+
+def _group_ranks(groups):
+    # Rang de chaque élément dans son groupe, groups étant trié
+    starts = np.flatnonzero(np.concatenate(([True], groups[1:] != groups[:-1])))
+    counts = np.diff(np.append(starts, len(groups)))
+    return np.arange(len(groups)) - np.repeat(starts, counts)
+
+
+def pair_notes(events, drums=False):
+    # Note-on et note-off appariés par piste, canal et note : chaque note-off ferme la plus
+    # ancienne note encore tenue (ordre FIFO, comme un synthétiseur), les note-off orphelins
+    # sont ignorés. Renvoie (notes, tick de début, tick de fin).
+    keep = np.ones(len(events.ticks), dtype=bool) if drums else events.channels != DRUM_CHANNEL
+    groups = ((events.tracks.astype(np.int64) * 16 + events.channels) * 128 + events.keys)[keep]
+    ticks, on = events.ticks[keep], events.on[keep]
+    order = np.lexsort((np.arange(len(ticks)), ticks, groups))
+    groups, ticks, on = groups[order], ticks[order], on[order]
+    if not len(groups):
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, empty
+
+    # Notes tenues avant chaque événement, sans descendre sous zéro : somme cumulée par groupe
+    # moins son minimum courant ; un décalage décroissant par groupe isole les groupes
+    starts = np.concatenate(([True], groups[1:] != groups[:-1]))
+    group_index = np.cumsum(starts)
+    step = np.where(on, 1, -1)
+    total = np.cumsum(step)
+    before = total - step
+    before -= before[starts][group_index - 1]
+    shift = group_index * (2 * len(groups) + 1)
+    lowest = np.minimum.accumulate(before - shift) + shift
+    held = before - lowest
+    closing = ~on & (held > 0)
+
+    # La k-ième note-on d'un groupe finit au k-ième note-off valide du même groupe
+    on_groups, on_ticks = groups[on], ticks[on]
+    off_groups, off_ticks = groups[closing], ticks[closing]
+    on_keys = on_groups << 32 | _group_ranks(on_groups)
+    off_keys = off_groups << 32 | _group_ranks(off_groups)
+    found = np.searchsorted(off_keys, on_keys)
+    matched = found < len(off_keys)
+    matched[matched] = off_keys[found[matched]] == on_keys[matched]
+    # Note jamais relâchée : elle tient jusqu'à la fin du morceau
+    end_ticks = np.full(len(on_ticks), events.end_tick, dtype=np.int64)
+    end_ticks[matched] = off_ticks[found[matched]]
+    return on_groups & 0x7F, on_ticks, np.maximum(end_ticks, on_ticks)
+
+
+def read_midi(source, drums=False):
+    # Fichier .mid (chemin ou octets) -> Partition polyphonique, en secondes
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        data = source
+    else:
+        with open(source, "rb") as f:
+            data = f.read()
+    events = read_events(data)
+    keys, on_ticks, off_ticks = pair_notes(events, drums)
+    onsets = events.seconds(on_ticks)
+    durations = events.seconds(off_ticks) - onsets
+    played = durations > 0
+    keys, onsets, durations = keys[played], onsets[played], durations[played]
+
+    # Ordre de la partition : par attaque, puis de la plus grave à la plus aiguë
+    order = np.lexsort((keys, onsets))
+    keys, onsets, durations = keys[order], onsets[order], durations[order]
+    distinct, note_ids = np.unique(keys, return_inverse=True)
+    return Partition([NOTE_NAMES[key] for key in distinct], note_ids, durations, onsets)
+
+
+def _vlq_bytes(values):
+    # Quantités de longueur variable de tout un tableau : (n, 4) octets et masque des octets utiles
+    values = np.asarray(values, dtype=np.int64)
+    if len(values) and values.max() >= 1 << 28:
+        raise ValueError("écart trop long pour un fichier MIDI")
+    groups = (values[:, None] >> np.array([21, 14, 7, 0])) & 0x7F
+    groups[:, :3] |= 0x80
+    size = 1 + (values >= 1 << 7) + (values >= 1 << 14) + (values >= 1 << 21)
+    return groups.astype(np.uint8), np.arange(4) >= 4 - size[:, None]
+
+
+def midi_bytes(partition, octave=1, bpm=120.0, ppq=480, velocity=100, channel=0):
+    # Partition -> fichier MIDI format 0 à tempo fixe ; les noms solfège suivent octave
+    keys = note_indices(partition.names, octave)[partition.note_ids]
+    played = (keys != REST) & (partition.duration > 0)
+    ticks_per_second = ppq * bpm / 60
+    on_ticks = np.round(partition.onset[played] * ticks_per_second).astype(np.int64)
+    off_ticks = np.round((partition.onset[played] + partition.duration[played]) * ticks_per_second)
+    off_ticks = np.maximum(off_ticks.astype(np.int64), on_ticks + 1)
+    keys = keys[played]
+
+    # Au même tick, les note-off passent avant les note-on (note rejouée)
+    count = len(keys)
+    ticks = np.concatenate((off_ticks, on_ticks))
+    is_on = np.repeat([False, True], count)
+    order = np.lexsort((is_on, ticks))
+    ticks, is_on, keys = ticks[order], is_on[order], np.tile(keys, 2)[order]
+
+    groups, mask = _vlq_bytes(np.diff(ticks, prepend=0))
+    message = np.stack([
+        np.where(is_on, 0x90, 0x80) | channel,
+        keys,
+        np.where(is_on, velocity, 0),
+    ], axis=1).astype(np.uint8)
+    body = np.concatenate((groups, message), axis=1)[
+        np.concatenate((mask, np.ones((len(ticks), 3), dtype=bool)), axis=1)]
+
+    tempo = int(round(60e6 / bpm)).to_bytes(3, "big")
+    track = b"\x00\xFF\x51\x03" + tempo + body.tobytes() + b"\x00\xFF\x2F\x00"
+    return (_CHUNK.pack(b"MThd", _HEADER.size) + _HEADER.pack(0, 1, ppq)
+            + _CHUNK.pack(b"MTrk", len(track)) + track)
+
+
+def write_midi(partition, path, octave=1, bpm=120.0, ppq=480):
+    with open(path, "wb") as f:
+        f.write(midi_bytes(partition, octave, bpm, ppq))
+
+
+def save_partition(partition, path):
+    # .ihmp garde les accords ; le texte, une note par ligne, n'a qu'une voix
+    if path.endswith(BINARY_EXT):
+        save_binary(partition, path)
+        return
+    writer = PartitionWriter(path)
+    for note, duration in partition.melody():
+        writer.write(note, duration)
+    writer.close()
+
+
+def convert(path, out_dir, fmt, drums=False):
+    # Un fichier, dans le sens donné par son extension ; renvoie (sortie, nombre de notes)
+    base = os.path.join(out_dir or os.path.dirname(path), os.path.splitext(os.path.basename(path))[0])
+    if path.lower().endswith(MIDI_EXTS):
+        partition = read_midi(path, drums)
+        out_path = base + (BINARY_EXT if fmt == "ihmp" else ".txt")
+        save_partition(partition, out_path)
+    else:
+        partition = load_partition(path)
+        out_path = base + ".mid"
+        write_midi(partition, out_path)
+    return out_path, len(partition)
+
+
+def _convert_job(args):
+    path, out_dir, fmt, drums = args
+    try:
+        return path, convert(path, out_dir, fmt, drums), None
+    except (OSError, ValueError, IndexError) as error:
+        return path, None, error
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Convertit des fichiers MIDI en partitions (et des partitions en MIDI), en parallèle.")
+    parser.add_argument("paths", nargs="+", help="fichiers .mid/.txt/.ihmp ou dossiers de .mid")
+    parser.add_argument("-o", "--out-dir", default="partitions", help="dossier de sortie")
+    parser.add_argument("-f", "--format", choices=("txt", "ihmp"), default="txt",
+                        help="format des partitions produites (txt : une seule voix ; ihmp : accords gardés)")
+    parser.add_argument("--drums", action="store_true", help="garder le canal 10 (percussions)")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(), help="nombre de processus")
+    args = parser.parse_args(argv)
+
+    paths = find_partitions(args.paths, MIDI_EXTS)
+    os.makedirs(args.out_dir, exist_ok=True)
+    jobs = [(path, args.out_dir, args.format, args.drums) for path in paths]
+    start = time.perf_counter()
+    failed = 0
+    if args.jobs > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(args.jobs) as pool:
+            results = list(pool.map(_convert_job, jobs, chunksize=max(1, len(jobs) // (args.jobs * 8))))
+    else:
+        results = [_convert_job(job) for job in jobs]
+    for path, result, error in results:
+        if error is not None:
+            failed += 1
+            print(f"{path}: {error}", file=sys.stderr)
+        else:
+            print(f"{path} -> {result[0]} ({result[1]} notes)")
+    elapsed = time.perf_counter() - start
+    rate = len(jobs) / elapsed * 60 if elapsed else 0.0
+    print(f"{len(jobs) - failed}/{len(jobs)} fichiers en {elapsed:.2f} s ({rate:.0f} fichiers/min)")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
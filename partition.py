@@ -0,0 +1,261 @@
+import argparse
+import os
+import re
+import struct
+import sys
+
+import numpy as np
+
+from gui.instruments.pitch import REST, note_frequencies, note_indices
+
+# Jetons reconnus comme des silences
+RESTS = {"0", "R", "r", "-"}
+
+# "#" est aussi un dièse : un commentaire commence en début de ligne ou après un blanc
+COMMENT = re.compile(r"(?:^|\s)#")
+
+# Fichiers MIDI standard, lus par gui.instruments.midi
+MIDI_EXTS = (".mid", ".midi")
+
+# Format binaire : en-tête fixe de 4 Kio (dont la table des noms de notes),
+# puis un enregistrement compact par note
+BINARY_EXT = ".ihmp"
+MAGIC = b"IHMP"
+VERSION = 1
+HEADER_SIZE = 4096
+RECORD = np.dtype([("note", "<i2"), ("onset", "<f8"), ("duration", "<f4")])
+_HEADER = struct.Struct("<4sHHQI")  # magic, version, taille d'un enregistrement, nombre, taille des noms
+
+# Partitions déjà lues : chemin -> (mtime, taille, durée par défaut, Partition)
+_cache = {}
+
+
+class Partition:
+    # Partition sous forme de tableaux parallèles : une case par note
+
+    def __init__(self, names, note_ids, durations, onsets=None):
+        # Pas de copie si les tableaux ont déjà le bon type (memmap d'un .ihmp)
+        self.names = names                                    # noms de notes distincts
+        self.note_ids = np.asarray(note_ids, dtype=np.int16)  # index dans names
+        self.duration = np.asarray(durations, dtype=np.float32)
+        if onsets is None:
+            durations = np.asarray(durations, dtype=np.float64)
+            onsets = np.concatenate(([0.0], np.cumsum(durations)[:-1])) if len(durations) else durations
+        self.onset = np.asarray(onsets, dtype=np.float64)
+
+    def frequencies(self, octave=1):
+        # Fréquence de chaque note (0 pour un silence), les noms Do…Si suivant l'octave
+        return note_frequencies(self.names, octave, np.float32)[self.note_ids]
+
+    @property
+    def length(self):
+        # Durée totale en secondes, au tempo d'origine ; avec des accords la dernière
+        # note attaquée n'est pas forcément la dernière à finir
+        return float((self.onset + self.duration).max()) if len(self) else 0.0
+
+    def __len__(self):
+        return len(self.note_ids)
+
+    def polyphony(self):
+        # Notes simultanées au plus, silences exclus ; temps arrondis à la µs pour qu'une note
+        # qui finit à l'attaque de la suivante (durées en float32) ne compte pas comme un accord
+        played = (note_indices(self.names)[self.note_ids] != REST) & (self.duration > 0)
+        starts = np.round(self.onset[played] * 1e6)
+        ends = np.round((self.onset[played] + self.duration[played]) * 1e6)
+        if not len(starts):
+            return 0
+        times = np.concatenate((starts, ends))
+        steps = np.repeat([1, -1], len(starts))
+        # À temps égal, une fin passe avant un début
+        return int(np.cumsum(steps[np.lexsort((steps, times))]).max())
+
+    def melody(self, octave=1):
+        # Une seule voix, pour le format texte : à chaque attaque la note la plus aiguë,
+        # coupée à l'attaque suivante, et des silences "0" dans les trous
+        if not len(self):
+            return self
+        keys = note_indices(self.names, octave)[self.note_ids]
+        order = np.lexsort((-self.duration, -keys.astype(np.int32), self.onset))
+        onset = self.onset[order]
+        chosen = order[np.concatenate(([True], onset[1:] != onset[:-1]))]
+        starts = self.onset[chosen]
+        ends = np.append(starts[1:], self.length)
+        durations = np.minimum(self.duration[chosen], ends - starts)
+        gaps = ends - starts - durations
+
+        names = list(self.names)
+        rest = names.index("0") if "0" in names else len(names)
+        if rest == len(names):
+            names.append("0")
+        note_ids = np.stack([self.note_ids[chosen], np.full(len(chosen), rest)], axis=1)
+        lengths = np.stack([durations, gaps], axis=1)
+        keep = np.stack([np.ones(len(chosen), dtype=bool), gaps > 1e-6], axis=1)
+        note_ids, lengths = note_ids[keep], lengths[keep]
+        if starts[0] > 1e-6:
+            note_ids, lengths = np.append(rest, note_ids), np.append(starts[0], lengths)
+        return Partition(names, note_ids, lengths)
+
+    def __iter__(self):
+        # Compatibilité avec l'ancien format : (note, durée)
+        for note_id, duration in zip(self.note_ids.tolist(), self.duration.tolist()):
+            yield self.names[note_id], duration
+
+
+def parse_partition(lines, default_duration=0.5):
+    # Une note par ligne, "NOTE DURÉE" ou "NOTE:DURÉE", durée facultative,
+    # commentaires après " #"
+    names = {}
+    note_ids = []
+    durations = []
+    for line in lines:
+        text = COMMENT.split(line, 1)[0].strip()
+        if not text:
+            continue
+        parts = text.replace(":", " ").split()
+        note = "0" if parts[0] in RESTS else parts[0]
+        duration = float(parts[1]) if len(parts) > 1 else default_duration
+        note_ids.append(names.setdefault(note, len(names)))
+        durations.append(duration)
+    return Partition(list(names), note_ids, durations)
+
+
+def find_partitions(paths, extensions=None):
+    # Fichiers donnés tels quels, dossiers remplacés par leurs partitions (triées)
+    extensions = extensions or (".txt", BINARY_EXT) + MIDI_EXTS
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            found.extend(sorted(
+                os.path.join(path, name) for name in os.listdir(path)
+                if name.lower().endswith(extensions)
+            ))
+        else:
+            found.append(path)
+    return found
+
+
+def load_partition(path, default_duration=0.5):
+    # Relit le fichier seulement s'il a changé depuis la dernière fois
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    key = (stat.st_mtime_ns, stat.st_size, default_duration)
+    cached = _cache.get(path)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    if path.endswith(BINARY_EXT):
+        partition = load_binary(path)
+    elif path.lower().endswith(MIDI_EXTS):
+        from gui.instruments.midi import read_midi
+        partition = read_midi(path)
+    else:
+        with open(path, encoding="utf-8") as f:
+            partition = parse_partition(f, default_duration)
+    _cache[path] = (key, partition)
+    return partition
+
+
+def _pack_header(count, names):
+    blob = "\n".join(names).encode("utf-8")
+    if _HEADER.size + len(blob) > HEADER_SIZE:
+        raise ValueError("trop de notes distinctes pour l'en-tête de la partition")
+    header = _HEADER.pack(MAGIC, VERSION, RECORD.itemsize, count, len(blob)) + blob
+    return header.ljust(HEADER_SIZE, b"\0")
+
+
+def _read_header(f):
+    raw = f.read(HEADER_SIZE)
+    if len(raw) < _HEADER.size:
+        raise ValueError("partition binaire tronquée")
+    magic, version, itemsize, count, names_len = _HEADER.unpack_from(raw)
+    if magic != MAGIC or version != VERSION or itemsize != RECORD.itemsize:
+        raise ValueError("ce n'est pas une partition binaire IHMP v1")
+    blob = raw[_HEADER.size:_HEADER.size + names_len]
+    return count, blob.decode("utf-8").split("\n") if blob else []
+
+
+def load_binary(path):
+    # Les enregistrements restent sur disque : seule la page lue est chargée
+    with open(path, "rb") as f:
+        count, names = _read_header(f)
+    if not count:
+        return Partition(names, [], [])
+    records = np.memmap(path, dtype=RECORD, mode="r", offset=HEADER_SIZE, shape=(count,))
+    return Partition(names, records["note"], records["duration"], records["onset"])
+
+
+def save_binary(partition, path):
+    count = len(partition)
+    with open(path, "wb") as f:
+        f.write(_pack_header(count, partition.names))
+        f.truncate(HEADER_SIZE + count * RECORD.itemsize)
+    if count:
+        records = np.memmap(path, dtype=RECORD, mode="r+", offset=HEADER_SIZE, shape=(count,))
+        records["note"] = partition.note_ids
+        records["onset"] = partition.onset
+        records["duration"] = partition.duration
+        records.flush()
+        del records
+
+
+class PartitionWriter:
+    # Écrit une partition note par note, en texte ou en binaire selon l'extension
+
+    def __init__(self, path):
+        self.path = path
+        self.binary = path.endswith(BINARY_EXT)
+        self.count = 0
+        self._names = {}
+        self._onset = 0.0
+        self._record = np.zeros(1, dtype=RECORD)
+        if self.binary:
+            self._f = open(path, "wb")
+            self._f.write(_pack_header(0, []))
+        else:
+            self._f = open(path, "w", encoding="utf-8")
+
+    def write(self, note, duration):
+        if self.binary:
+            self._record["note"] = self._names.setdefault(note, len(self._names))
+            self._record["onset"] = self._onset
+            self._record["duration"] = duration
+            self._f.write(self._record.tobytes())
+            self._onset += duration
+        else:
+            self._f.write(f"{note} {duration:.4f}\n")
+        self.count += 1
+
+    def flush(self):
+        if self.binary:
+            # L'en-tête suit le nombre de notes déjà écrites
+            self._f.seek(0)
+            self._f.write(_pack_header(self.count, list(self._names)))
+            self._f.seek(0, os.SEEK_END)
+        self._f.flush()
+
+    def sync(self):
+        # Point de reprise : ce qui est écrit survit à un plantage
+        self.flush()
+        os.fsync(self._f.fileno())
+
+    def close(self):
+        self.flush()
+        self._f.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convertit des partitions .txt au format binaire .ihmp.")
+    parser.add_argument("partitions", nargs="+", help="fichiers .txt à convertir")
+    parser.add_argument("-o", "--out-dir", help="dossier de sortie (par défaut, à côté du .txt)")
+    args = parser.parse_args(argv)
+
+    for path in args.partitions:
+        out_dir = args.out_dir or os.path.dirname(path)
+        out_path = os.path.join(out_dir, os.path.splitext(os.path.basename(path))[0] + BINARY_EXT)
+        partition = load_partition(path)
+        save_binary(partition, out_path)
+        print(f"{path} -> {out_path} ({len(partition)} notes)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,122 +1,84 @@
 import time
 
-from PyQt5.QtCore import pyqtSignal, QPropertyAnimation, QEasingCurve, QTimer
-from PyQt5.QtWidgets import QWidget, QPushButton, QHBoxLayout, QVBoxLayout
+from PyQt5.QtCore import pyqtSignal, QRect, QTimer
 
 from config import settings
-from gui.instruments.instrument import note_to_frequency, MusicPlayer
+from gui.instruments.instrument import shared_player
+from gui.instruments.keyboard import Key, KeyboardWidget, KeyStyle
+from gui.instruments.pitch import note_frequency
+from gui.instruments.tracing import tracer
 
 
-class Piano(QWidget):
+class Piano(KeyboardWidget):
     notePlayed = pyqtSignal(str, float)
 
-    def __init__(self, octaves=1, parent=None):
+    def __init__(self, octaves=1, parent=None, player=None):
         super().__init__(parent)
         self.octaves = octaves
-        self.player = MusicPlayer()
+        self.player = player if player is not None else shared_player()
         self.click_duration = float(settings.value("click_piano", 0.5))
 
         # Key dimensions and spacing
         self.white_w, self.white_h = 60, 200
         self.black_w, self.black_h = 36, 120
-        self.white_spacing, self.black_spacing = 2, 4
+        self.white_spacing = 2
+
+        # Note names per octave
+        self.white_notes = ['Do', 'Ré', 'Mi', 'Fa', 'Sol', 'La', 'Si']
+        self.black_notes = ['Do#', 'Ré#', None, 'Fa#', 'Sol#', 'La#', None]
 
         # Animation timing
         self.anim_dur = 100
+        self.press_ms = self.anim_dur
 
+        self.keyPressed.connect(self._play_key)
         self._build_ui()
 
     def _build_ui(self):
-        # Clear existing layout
-        old_layout = self.layout()
-        if old_layout:
-            QWidget().setLayout(old_layout)
-
-        # Create main layouts
-        main_layout = QVBoxLayout(self)
-        main_layout.setContentsMargins(0, 0, 0, 0)
-        main_layout.setSpacing(0)
-
-        black_layout = QHBoxLayout()
-        black_layout.setContentsMargins(0, 0, 0, 0)
-        black_layout.setSpacing(self.black_spacing)
-
-        white_layout = QHBoxLayout()
-        white_layout.setContentsMargins(0, 0, 0, 0)
-        white_layout.setSpacing(self.white_spacing)
-
-        # Note names per octave
-        white_notes = ['Do', 'Ré', 'Mi', 'Fa', 'Sol', 'La', 'Si']
-        black_notes = ['Do#', 'Ré#', None, 'Fa#', 'Sol#', 'La#', None]
-
-        # Build keys for each octave
+        # Key geometry table: white keys side by side, black keys on top at the boundaries
+        white_style = KeyStyle("white", "#ddd", bevel=True, shrink=2)
+        black_style = KeyStyle("black", "#333", text="white", radius=4, shrink=2)
+        step = self.white_w + self.white_spacing
+
+        # (note, octave index) -> key
+        self.key_buttons = {}
+        whites, blacks = [], []
         for oct_idx in range(self.octaves):
-            # White keys
-            for note in white_notes:
-                btn = QPushButton(note)
-                btn.setFixedSize(self.white_w, self.white_h)
-                btn.setStyleSheet(
-                    "QPushButton { background: white;"
-                    " border-top:2px solid #eee; border-left:2px solid #eee;"
-                    " border-bottom:2px solid #888; border-right:2px solid #888; }"
-                    "QPushButton:pressed { background: #ddd; }"
-                )
-                btn.clicked.connect(self._make_play_fn(note, oct_idx, btn))
-                white_layout.addWidget(btn)
-
-            # Black keys
-            for note in black_notes:
-                if note:
-                    btn = QPushButton(note)
-                    btn.setFixedSize(self.black_w, self.black_h)
-                    btn.setStyleSheet(
-                        "QPushButton { background: black; color: white;"
-                        " border-top-left-radius:4px; border-top-right-radius:4px; }"
-                        "QPushButton:pressed { background: #333; }"
-                    )
-                    btn.clicked.connect(self._make_play_fn(note, oct_idx, btn))
-                    black_layout.addWidget(btn)
-                else:
-                    spacer = QWidget()
-                    spacer.setFixedSize(self.white_w, self.black_h)
-                    black_layout.addWidget(spacer)
-
-        main_layout.addLayout(black_layout)
-        main_layout.addLayout(white_layout)
-        self.setLayout(main_layout)
-
-        # Update geometry hints
-        self.updateGeometry()
-        self.adjustSize()
-
-    def _make_play_fn(self, note, oct_idx, button):
-        def handler():
-            # Animate key press
-            orig = button.geometry()
-            shrink = orig.adjusted(2, 2, -2, -2)
-            anim = QPropertyAnimation(button, b"geometry", self)
-            anim.setDuration(self.anim_dur)
-            anim.setEasingCurve(QEasingCurve.InOutQuad)
-            anim.setKeyValueAt(0, orig)
-            anim.setKeyValueAt(0.5, shrink)
-            anim.setKeyValueAt(1, orig)
-            anim.start()
-
-            # Play tone after half animation
-            def play_note():
-                freqs = note_to_frequency.get(note, [])
-                if len(freqs) > oct_idx:
-                    freq = freqs[oct_idx]
-                elif freqs:
-                    freq = freqs[0]
-                else:
-                    freq = 440
-                self.player.play_piano_tone(freq, self.click_duration)
-                self.notePlayed.emit(note, time.time())
-
-            QTimer.singleShot(self.anim_dur // 2, play_note)
-
-        return handler
+            for i, (white, black) in enumerate(zip(self.white_notes, self.black_notes)):
+                x = (oct_idx * len(self.white_notes) + i) * step
+                key = Key((white, oct_idx), white, QRect(x, 0, self.white_w, self.white_h), white_style)
+                whites.append(key)
+                self.key_buttons[key.id] = key
+                if black:
+                    left = x + step - self.white_spacing // 2 - self.black_w // 2
+                    key = Key((black, oct_idx), black, QRect(left, 0, self.black_w, self.black_h), black_style)
+                    blacks.append(key)
+                    self.key_buttons[key.id] = key
+        self.set_keys([whites, blacks])
+
+    def _play_key(self, key_id):
+        note, oct_idx = key_id
+        trace = tracer.claim(note)
+
+        # Play tone after half animation
+        def play_note():
+            freq = self.frequency(note, oct_idx)
+            tracer.mark(trace, "timer")
+            tracer.active = trace
+            self.player.play_piano_tone(freq, self.click_duration)
+            tracer.finish(trace)
+            self.notePlayed.emit(note, time.time())
+
+        QTimer.singleShot(self.anim_dur // 2, play_note)
+
+    def frequency(self, note, oct_idx):
+        return note_frequency(note, oct_idx + 1) or 440
+
+    def playable_tones(self):
+        # (instrument, fréquence, durée) de chaque touche affichée
+        notes = self.white_notes + [n for n in self.black_notes if n]
+        return [("piano", self.frequency(note, oct_idx), self.click_duration)
+                for oct_idx in range(self.octaves) for note in notes]
 
     def setOctaves(self, octaves):
         if octaves != self.octaves and 1 <= octaves <= 3:
@@ -0,0 +1,88 @@
+import numpy as np
+
+# Tempérament égal, La4 = 440 Hz, indexé par numéro MIDI (0 = Do-1 … 127 = Sol9)
+A4_MIDI = 69
+A4_FREQUENCY = 440.0
+FREQUENCIES = A4_FREQUENCY * 2.0 ** ((np.arange(128) - A4_MIDI) / 12)
+FREQUENCIES.flags.writeable = False
+
+# Index renvoyé pour un silence ou un nom inconnu
+REST = -1
+
+# Demi-tons depuis le Do de la même octave, avec toutes les orthographes usuelles (dièses, bémols,
+# enharmonies) : Cb4 est Si3 et B#4 est Do5
+_SEMITONES = {
+    "C": 0, "C#": 1, "Db": 1, "D": 2, "D#": 3, "Eb": 3, "E": 4, "Fb": 4, "E#": 5, "F": 5,
+    "F#": 6, "Gb": 6, "G": 7, "G#": 8, "Ab": 8, "A": 9, "A#": 10, "Bb": 10, "B": 11, "Cb": -1, "B#": 12,
+}
+_SOLFEGE = {"Do": "C", "Ré": "D", "Re": "D", "Mi": "E", "Fa": "F", "Sol": "G", "La": "A", "Si": "B"}
+
+# Noms anglais avec octave (« A4 », « Bb3 ») -> numéro MIDI absolu
+ENGLISH = {
+    name + str(octave): (octave + 1) * 12 + semitone
+    for name, semitone in _SEMITONES.items()
+    for octave in range(-1, 10)
+    if 0 <= (octave + 1) * 12 + semitone < len(FREQUENCIES)
+}
+
+# Numéro MIDI -> nom anglais avec octave, en dièses (« C4 », « A#4 »)
+NOTE_NAMES = tuple(
+    ("C", "C#", "D", "D#", "E", "F", "F#", "G", "G#", "A", "A#", "B")[index % 12] + str(index // 12 - 1)
+    for index in range(len(FREQUENCIES))
+)
+
+# Noms solfège sans octave (« Do », « Sib ») -> numéro MIDI de l'octave 1 du clavier (Do = Do4)
+SOLFEGE = {
+    solfege + accidental: 60 + _SEMITONES[english + accidental]
+    for solfege, english in _SOLFEGE.items()
+    for accidental in ("", "#", "b")
+    if english + accidental in _SEMITONES
+}
+
+# Octaves du clavier proposées par l'interface, pour les noms solfège
+OCTAVES = (1, 2, 3)
+
+# Vue compatible avec l'ancienne table : solfège -> une fréquence par octave, anglais -> fréquence
+note_to_frequency = {
+    **{name: tuple(float(FREQUENCIES[index + 12 * (octave - 1)]) for octave in OCTAVES)
+       for name, index in SOLFEGE.items()},
+    **{name: float(FREQUENCIES[index]) for name, index in ENGLISH.items()},
+}
+
+
+def note_index(note, octave=1):
+    # Numéro MIDI d'un nom de note, REST pour un silence ou un nom inconnu
+    index = ENGLISH.get(note)
+    if index is not None:
+        return index
+    index = SOLFEGE.get(note)
+    if index is None:
+        return REST
+    index += 12 * (octave - 1)
+    return index if index < len(FREQUENCIES) else REST
+
+
+def note_frequency(note, octave=1):
+    # Fréquence d'une note de partition, None pour un silence ou une note inconnue
+    index = note_index(note, octave)
+    return None if index == REST else float(FREQUENCIES[index])
+
+
+def note_indices(names, octave=1):
+    # Tout une colonne de noms d'un coup : chaque nom distinct n'est cherché qu'une fois
+    names = list(names)
+    lookup = {name: note_index(name, octave) for name in set(names)}
+    return np.fromiter(map(lookup.__getitem__, names), np.int16, len(names))
+
+
+def frequencies_of(indices, dtype=np.float64):
+    # Numéros MIDI -> fréquences, 0 pour les silences
+    indices = np.asarray(indices)
+    out = FREQUENCIES.astype(dtype)[np.maximum(indices, 0)]
+    out[indices == REST] = 0
+    return out
+
+
+def note_frequencies(names, octave=1, dtype=np.float64):
+    # Colonne de noms de notes -> tableau de fréquences (0 pour un silence)
+    return frequencies_of(note_indices(names, octave), dtype)
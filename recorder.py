@@ -0,0 +1,55 @@
+import queue
+import threading
+import time
+
+from gui.instruments.partition import PartitionWriter
+
+
+class Recorder:
+    # Enregistrement au fil de l'eau : les notes passent par une file bornée
+    # vers un thread qui les écrit sur disque avec des points de reprise réguliers.
+
+    def __init__(self, path, flush_every=32, checkpoint_interval=5.0, max_pending=1024):
+        self.writer = PartitionWriter(path)
+        self.flush_every = flush_every
+        self.checkpoint_interval = checkpoint_interval
+        self._events = queue.Queue(maxsize=max_pending)
+        self._thread = threading.Thread(target=self._run, name="recorder", daemon=True)
+        self._thread.start()
+
+    def record(self, note, timestamp, click):
+        self._events.put((note, timestamp, click))
+
+    def close(self):
+        self._events.put(None)
+        self._thread.join()
+
+    def _run(self):
+        writer = self.writer
+        prev_time = None
+        unflushed = 0
+        last_sync = time.monotonic()
+        while True:
+            try:
+                event = self._events.get(timeout=self.checkpoint_interval)
+            except queue.Empty:
+                event = False
+            if event:
+                note, t, click = event
+                # Silence entre deux notes au-delà de la durée d'un clic
+                delta = t - prev_time if prev_time is not None else 0.0
+                if delta > click:
+                    writer.write("0", delta - click)
+                writer.write(note, click)
+                prev_time = t
+                unflushed += 1
+                if unflushed >= self.flush_every:
+                    writer.flush()
+                    unflushed = 0
+            if event is None:
+                writer.close()
+                return
+            if time.monotonic() - last_sync >= self.checkpoint_interval:
+                writer.sync()
+                unflushed = 0
+                last_sync = time.monotonic()
@@ -0,0 +1,88 @@
+import argparse
+import os
+import sys
+import time
+import wave
+
+import numpy as np
+
+from gui.instruments.partition import load_partition
+from gui.instruments.synth import INSTRUMENTS, Synthesizer  # noqa: F401 (ré-exporté)
+
+
+def rendered_length(partition, tempo_factor, sample_rate):
+    # Nombre d'échantillons du rendu complet
+    return int(np.ceil(partition.length / tempo_factor * sample_rate))
+
+
+def render_partition(partition, instrument, tempo_factor=1.0, synth=None, octave=1, out=None):
+    # Toute la partition dans un seul tampon préalloué (out si fourni), chaque note ajoutée à sa position ;
+    # le mélange est divisé par le nombre maximal de notes simultanées, comme au séquenceur
+    synth = synth or Synthesizer()
+    sr = synth.sample_rate
+    total = rendered_length(partition, tempo_factor, sr)
+    if out is None:
+        out = np.zeros(total)
+    else:
+        out[:] = 0
+    if not len(partition):
+        return out
+
+    durations = partition.duration.astype(np.float64) / tempo_factor
+    starts = np.round(partition.onset / tempo_factor * sr).astype(np.int64)
+
+    # Chaque couple (fréquence, durée) distinct est synthétisé une fois, en un seul appel
+    freqs = partition.frequencies(octave).astype(np.float64)
+    playable = (freqs > 0) & ((sr * durations).astype(np.int64) > 0)
+    pairs = np.stack([freqs[playable], durations[playable]], axis=1)
+    unique, which = np.unique(pairs, axis=0, return_inverse=True)
+    batch = synth.render_batch(instrument, unique[:, 0], unique[:, 1])
+
+    for start, tone in zip(starts[playable].tolist(), which.ravel().tolist()):
+        tone = batch[tone]
+        end = min(start + len(tone), total)
+        out[start:end] += tone[:end - start]
+    voices = partition.polyphony()
+    if voices > 1:
+        out *= 1.0 / voices
+    return out
+
+
+def write_wav(path, mix, sample_rate, gain=0.5):
+    samples = (np.clip(mix * gain, -1.0, 1.0) * 32767).astype("<i2")
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(samples.tobytes())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rend des partitions .txt en fichiers WAV, sans carte son.")
+    parser.add_argument("partitions", nargs="+", help="fichiers .txt à rendre")
+    parser.add_argument("-i", "--instrument", choices=INSTRUMENTS, default="piano")
+    parser.add_argument("-t", "--tempo", type=float, default=1.0, help="facteur de tempo (1.0 = normal)")
+    parser.add_argument("--octave", type=int, choices=(1, 2, 3), default=1,
+                        help="octave utilisée pour les notes Do…Si")
+    parser.add_argument("--sample-rate", type=int, default=44100)
+    parser.add_argument("-o", "--out-dir", default=".", help="dossier de sortie des .wav")
+    args = parser.parse_args(argv)
+
+    synth = Synthesizer(args.sample_rate)
+    os.makedirs(args.out_dir, exist_ok=True)
+    start = time.perf_counter()
+    for path in args.partitions:
+        t0 = time.perf_counter()
+        mix = render_partition(load_partition(path), args.instrument, args.tempo, synth, args.octave)
+        name = os.path.splitext(os.path.basename(path))[0] + ".wav"
+        out_path = os.path.join(args.out_dir, name)
+        write_wav(out_path, mix, args.sample_rate)
+        print(f"{path} -> {out_path} ({len(mix) / args.sample_rate:.1f} s audio, "
+              f"{(time.perf_counter() - t0) * 1000:.0f} ms)")
+    elapsed = time.perf_counter() - start
+    print(f"{len(args.partitions)} partition(s) en {elapsed:.2f} s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,56 @@
+import numpy as np
+
+
+class Resonator:
+    # Une voix filtrée : coefficients partagés, état propre pour enchaîner les blocs
+
+    def __init__(self, b, a, zi):
+        self.b = b
+        self.a = a
+        self._zi = zi
+        self.state = None
+
+    def process(self, block):
+        # scipy.signal coûte plus d'une seconde à importer : seulement à la première note
+        from scipy.signal import lfilter
+        if self.state is None:
+            # Même départ que lfilter_zi * premier échantillon
+            self.state = self._zi * block[0]
+        out, self.state = lfilter(self.b, self.a, block, zi=self.state)
+        return out
+
+    def reset(self):
+        self.state = None
+
+
+class ResonatorBank:
+    # Filtres de résonance du xylophone, conçus une seule fois par fréquence
+
+    def __init__(self, sample_rate, frequencies=()):
+        self.sample_rate = sample_rate
+        self._coefficients = {}
+        self.prime(frequencies)
+
+    def prime(self, frequencies):
+        for frequency in frequencies:
+            self.coefficients(frequency)
+
+    def coefficients(self, frequency):
+        frequency = float(frequency)
+        coefficients = self._coefficients.get(frequency)
+        if coefficients is None:
+            from scipy.signal import bilinear, lfilter_zi
+            # Section du second ordre : pôles à 0.95 sur l'angle de la fréquence
+            sr = self.sample_rate
+            b, a = bilinear([1, 0, 0], [1, -2 * 0.95 * np.cos(2 * np.pi * frequency / sr), 0.9025], fs=sr)
+            zi = lfilter_zi(b, a)
+            for array in (b, a, zi):
+                array.flags.writeable = False
+            coefficients = self._coefficients[frequency] = (b, a, zi)
+        return coefficients
+
+    def voice(self, frequency):
+        return Resonator(*self.coefficients(frequency))
+
+    def __len__(self):
+        return len(self._coefficients)
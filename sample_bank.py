@@ -0,0 +1,161 @@
+import os
+import struct
+import zipfile
+
+import numpy as np
+from PyQt5.QtCore import QThread, pyqtSignal
+
+from gui.instruments.synth import INSTRUMENTS
+
+
+class SampleBank:
+    # Notes pré-rendues (clé du ToneCache -> échantillons int16, au format de to_samples),
+    # persistées dans un seul fichier .npz non compressé et relues en memmap.
+
+    def __init__(self, path=None, channels=2, sample_rate=None, dtype=None):
+        self.path = path
+        # Format des notes rendues : une banque d'un autre mode de qualité est à refaire
+        self.sample_rate = sample_rate
+        self.dtype = np.dtype(dtype).name if dtype is not None else None
+        # (index clé -> (début, longueur), échantillons) remplacés d'un bloc
+        self._data = ({}, np.empty((0, channels) if channels > 1 else 0, dtype=np.int16))
+
+    @property
+    def channels(self):
+        samples = self._data[1]
+        return samples.shape[1] if samples.ndim > 1 else 1
+
+    def matches(self, player):
+        return (self.sample_rate == player.sample_rate and self.dtype == player.dtype.name
+                and self.channels == player.output_channels)
+
+    def get(self, key):
+        index, samples = self._data
+        span = index.get(key)
+        if span is None:
+            return None
+        start, length = span
+        return samples[start:start + length]
+
+    def __contains__(self, key):
+        return key in self._data[0]
+
+    def __len__(self):
+        return len(self._data[0])
+
+    def missing(self, keys):
+        index = self._data[0]
+        return [key for key in dict.fromkeys(keys) if key not in index]
+
+    def build(self, player, keys, progress=None):
+        # Rend les notes absentes de la banque ; renvoie le nombre de notes ajoutées
+        todo = self.missing(keys)
+        if not todo:
+            if progress:
+                progress(0, 0)
+            return 0
+
+        index, samples = self._data
+        index = dict(index)
+        chunks = [samples]
+        offset = len(samples)
+        done = 0
+        for instrument in INSTRUMENTS:
+            # Toutes les touches d'un instrument en un seul rendu groupé
+            group = [key for key in todo if key[0] == instrument]
+            if not group:
+                continue
+            batch = player.render_batch(instrument, [key[1] for key in group], [key[2] for key in group])
+            for i, key in enumerate(group):
+                rendered = player.to_samples(batch[i])
+                index[key] = (offset, len(rendered))
+                chunks.append(rendered)
+                offset += len(rendered)
+            done += len(group)
+            if progress:
+                progress(done, len(todo))
+
+        self._data = (index, np.concatenate(chunks))
+        return len(todo)
+
+    def save(self, path=None):
+        path = path or self.path
+        index, samples = self._data
+        keys = list(index)
+        spans = np.array([index[key] for key in keys], dtype=np.int64).reshape(-1, 2)
+
+        # Écrit à côté puis remplace : l'ancien fichier peut être mappé en mémoire
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                instruments=np.array([INSTRUMENTS.index(k[0]) for k in keys], dtype=np.int8),
+                frequencies=np.array([k[1] for k in keys], dtype=np.float64),
+                durations=np.array([k[2] for k in keys], dtype=np.float64),
+                sample_rates=np.array([k[3] for k in keys], dtype=np.int32),
+                offsets=spans[:, 0],
+                lengths=spans[:, 1],
+                samples=samples,
+                sample_rate=np.int32(self.sample_rate or 0),
+                dtype=np.array(self.dtype or ""),
+            )
+        os.replace(tmp_path, path)
+        self.path = path
+
+    @classmethod
+    def load(cls, path):
+        bank = cls(path)
+        with np.load(path) as data:
+            keys = zip(
+                (INSTRUMENTS[i] for i in data["instruments"]),
+                data["frequencies"].tolist(),
+                data["durations"].tolist(),
+                data["sample_rates"].tolist(),
+            )
+            index = dict(zip(keys, zip(data["offsets"].tolist(), data["lengths"].tolist())))
+            samples = _memmap_member(path, "samples")
+            if samples is None:
+                samples = data["samples"]
+            # Banques enregistrées sans leur format : inconnu, donc à refaire
+            if "sample_rate" in data.files:
+                bank.sample_rate = int(data["sample_rate"]) or None
+                bank.dtype = str(data["dtype"]) or None
+        bank._data = (index, samples)
+        return bank
+
+
+def _memmap_member(path, name):
+    # np.load ignore mmap_mode pour les .npz : on retrouve l'offset du .npy dans le zip
+    with zipfile.ZipFile(path) as zf:
+        info = zf.getinfo(name + ".npy")
+    if info.compress_type != zipfile.ZIP_STORED:
+        return None
+    with open(path, "rb") as f:
+        f.seek(info.header_offset)
+        name_len, extra_len = struct.unpack("<HH", f.read(30)[26:30])
+        f.seek(info.header_offset + 30 + name_len + extra_len)
+        version = np.lib.format.read_magic(f)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+        offset = f.tell()
+    if not shape or 0 in shape:
+        return np.empty(shape, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=shape,
+                     order="F" if fortran_order else "C")
+
+
+class SampleBankWorker(QThread):
+    progress = pyqtSignal(int, int)
+
+    def __init__(self, bank, player, keys, parent=None):
+        super().__init__(parent)
+        self.bank = bank
+        self.player = player
+        self.keys = keys
+
+    def run(self):
+        added = self.bank.build(self.player, self.keys, progress=self.progress.emit)
+        if added and self.bank.path:
+            self.bank.save()
@@ -0,0 +1,248 @@
+import time
+from collections import deque
+
+import numpy as np
+
+from gui.instruments.partition import Partition
+from gui.instruments.tone_cache import ToneCache
+
+
+class Sequencer:
+    # Lecture de partition à l'échantillon près : toutes les positions sont
+    # calculées à l'avance et l'audio est envoyé par blocs contigus sur un
+    # canal réservé, avec toujours un bloc d'avance en file d'attente.
+
+    def __init__(self, player, block_seconds=0.25):
+        self.player = player
+        self.block_size = int(player.sample_rate * block_seconds)
+        # Canal réservé à la première lecture : pas de mixer ouvert au démarrage
+        self.channel = None
+        self.load(Partition([], [], []), "piano")
+
+    def load(self, partition, instrument, tempo_factor=1.0, octave=1, bar_seconds=1.0):
+        sr = self.player.sample_rate
+        self.instrument = instrument
+        durations = partition.duration.astype(np.float64) / tempo_factor
+
+        # Index des attaques : sommes cumulées des durées au tempo choisi, en échantillons,
+        # fixées une fois pour toutes ; toute recherche dans le temps y est dichotomique
+        self.starts = np.round(partition.onset / tempo_factor * sr).astype(np.int64)
+        self.lengths = (sr * durations).astype(np.int64)
+        self.frequencies = partition.frequencies(octave)
+        self.durations = durations
+        self.total = int(np.ceil(partition.length / tempo_factor * sr))
+        self.max_length = int(self.lengths.max()) if len(durations) else 0
+        # Accords : le mélange est divisé par le nombre maximal de notes simultanées,
+        # une partition à une voix garde son niveau
+        self.gain = 1.0 / max(partition.polyphony(), 1)
+        # Les partitions n'ont pas de barres de mesure : durée d'une mesure au tempo d'origine
+        self.bar_length = bar_seconds / tempo_factor * sr
+
+        # Formes d'onde des notes, bornées comme le cache du lecteur : les longues partitions
+        # aux durées toutes différentes ne gardent pas chaque note en mémoire
+        self._tones = ToneCache()
+        # Prochain échantillon à rendre, et blocs envoyés au canal :
+        # (heure de début prévue, segments (début, longueur)), celui qui joue en tête
+        self._cursor = 0
+        self._chunks = deque()
+        self._loop = None
+        self._t0 = None
+        self.paused = False
+        # Retard du sondage : entre le passage d'un bloc en lecture et le pump() qui le voit.
+        # La carte son ne donne pas sa position : ce n'est pas une dérive audio, les underruns le sont
+        self.poll_delays = []
+        self.underruns = 0
+
+    def render_range(self, b0, b1):
+        block = np.zeros(b1 - b0, dtype=self.player.dtype)
+        first = np.searchsorted(self.starts, b0 - self.max_length)
+        last = np.searchsorted(self.starts, b1)
+        for i in range(first, last):
+            freq, start, length = float(self.frequencies[i]), self.starts[i], self.lengths[i]
+            if freq <= 0 or length == 0 or start + length <= b0:
+                continue
+            tone = self._tone(freq, self.durations[i])
+            lo, hi = max(start, b0), min(start + len(tone), b1)
+            block[lo - b0:hi - b0] += tone[lo - start:hi - start]
+        return block
+
+    def _tone(self, freq, duration):
+        key = (freq, duration)
+        entry = self._tones.get(key)
+        if entry is not None:
+            return entry[0]
+        tone = self.player.render_tone(self.instrument, freq, duration)
+        self._tones.put(key, tone)
+        return tone
+
+    def _next_segments(self):
+        # Un bloc à partir du curseur ; en fin de boucle il repart de A dans le même bloc, sans trou
+        segments = []
+        need = self.block_size
+        while need:
+            if self._loop is not None and self._cursor == self._loop[1]:
+                self._cursor = self._loop[0]
+            end = self._loop[1] if self._loop is not None and self._cursor < self._loop[1] else self.total
+            if self._cursor >= end:
+                break
+            n = min(need, end - self._cursor)
+            segments.append((self._cursor, n))
+            self._cursor += n
+            need -= n
+        return segments
+
+    def _sound(self, segments):
+        block = np.concatenate([self.render_range(start, start + n) for start, n in segments])
+        if self.gain != 1.0:
+            block *= self.gain
+        return self.player.make_sound(self.player.to_samples(block))
+
+    def start(self):
+        # Lecture à partir du curseur : début, position de pause ou de recherche
+        if self.channel is None:
+            self.channel = self.player.reserve_channel()
+        self.channel.stop()
+        self._chunks.clear()
+        self.paused = False
+        segments = self._next_segments()
+        if not segments:
+            self._t0 = None
+            return
+        # Premier bloc rendu avant de lancer l'horloge (scipy peut encore être en cours de chargement)
+        first = self._sound(segments)
+        self._t0 = time.perf_counter()
+        self.channel.play(first)
+        self._chunks.append((self._t0, segments))
+        self._queue_next()
+
+    def _queue_next(self):
+        segments = self._next_segments()
+        if segments:
+            started, previous = self._chunks[-1]
+            expected = started + sum(n for _, n in previous) / self.player.sample_rate
+            self.channel.queue(self._sound(segments))
+            self._chunks.append((expected, segments))
+
+    def pump(self):
+        # À appeler régulièrement ; renvoie False quand la lecture est terminée
+        if self._t0 is None:
+            return False
+        now = time.perf_counter()
+        if self.channel.get_queue() is None and len(self._chunks) > 1:
+            self._chunks.popleft()
+            if self.channel.get_busy():
+                self.poll_delays.append(now - self._chunks[0][0])
+            else:
+                # Le bloc en attente est déjà fini : le suivant part tout de suite
+                self.underruns += 1
+                length = sum(n for _, n in self._chunks[0][1])
+                self._chunks[0] = (now - length / self.player.sample_rate, self._chunks[0][1])
+            self._queue_next()
+        if len(self._chunks) <= 1 and not self.channel.get_busy():
+            self._t0 = None
+            return False
+        return True
+
+    def stop(self):
+        if self.channel is not None:
+            self.channel.stop()
+        self._chunks.clear()
+        self._t0 = None
+        self._cursor = 0
+        self.paused = False
+
+    @property
+    def playing(self):
+        return self._t0 is not None
+
+    def pause(self):
+        # Garde l'échantillon en cours de lecture ; resume() repart exactement de là
+        if self._t0 is None:
+            return
+        self._cursor = self.position_samples()
+        self.channel.stop()
+        self._chunks.clear()
+        self._t0 = None
+        self.paused = True
+
+    def resume(self):
+        if self.paused:
+            self.start()
+
+    def position_samples(self):
+        # Échantillon en cours de lecture, d'après l'heure de début prévue des blocs envoyés :
+        # entre deux pump(), le bloc en attente a pu commencer sans qu'on l'ait encore vu
+        if self._t0 is None:
+            return self._cursor
+        now = time.perf_counter()
+        for started, segments in reversed(self._chunks):
+            if now >= started:
+                break
+        offset = max(int((now - started) * self.player.sample_rate), 0)
+        for start, n in segments:
+            if offset < n:
+                return start + offset
+            offset -= n
+        return start + n
+
+    @property
+    def position(self):
+        # Position de lecture, en secondes
+        return self.position_samples() / self.player.sample_rate
+
+    @property
+    def duration(self):
+        return self.total / self.player.sample_rate
+
+    def seek(self, seconds):
+        self.seek_sample(int(round(seconds * self.player.sample_rate)))
+
+    def seek_sample(self, sample):
+        self._cursor = min(max(int(sample), 0), self.total)
+        if self._t0 is not None:
+            self.start()
+
+    def seek_bar(self, bar):
+        self.seek_sample(round(bar * self.bar_length))
+
+    def bar_at(self, seconds=None):
+        # Mesure (à partir de 0) à la position donnée, ou à la position de lecture
+        sample = self.position_samples() if seconds is None else seconds * self.player.sample_rate
+        return int(sample // self.bar_length) if self.bar_length else 0
+
+    def note_at(self, seconds=None):
+        # Index de la dernière note attaquée à cette position, -1 avant la première
+        sample = self.position_samples() if seconds is None else round(seconds * self.player.sample_rate)
+        return int(np.searchsorted(self.starts, sample, side="right")) - 1
+
+    def set_loop(self, a, b):
+        # Boucle A–B en secondes ; la lecture en cours la prend au bloc suivant
+        sr = self.player.sample_rate
+        a = min(max(int(round(a * sr)), 0), self.total)
+        b = min(max(int(round(b * sr)), 0), self.total)
+        self._loop = (min(a, b), max(a, b)) if a != b else None
+        if self._loop is not None and self._t0 is not None:
+            # B dans les blocs déjà envoyés : on les refait depuis la position courante (B au plus)
+            if self._chunks[0][1][0][0] <= self._loop[1] < self._cursor:
+                self.seek_sample(min(self.position_samples(), self._loop[1]))
+
+    def clear_loop(self):
+        self._loop = None
+
+    @property
+    def loop(self):
+        if self._loop is None:
+            return None
+        sr = self.player.sample_rate
+        return self._loop[0] / sr, self._loop[1] / sr
+
+    def playback_stats(self):
+        if not self.poll_delays:
+            return {"blocks": 0, "poll_mean_ms": 0.0, "poll_max_ms": 0.0, "underruns": self.underruns}
+        delays = np.abs(np.array(self.poll_delays)) * 1000
+        return {
+            "blocks": len(delays),
+            "poll_mean_ms": float(delays.mean()),
+            "poll_max_ms": float(delays.max()),
+            "underruns": self.underruns,
+        }
@@ -0,0 +1,222 @@
+import time
+import wave
+
+import numpy as np
+
+
+class PygameSink:
+    # Sortie réelle par pygame.mixer, importé et ouvert au premier son (ou par open())
+
+    def __init__(self, sample_rate=44100, channels=8, output_channels=2):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.output_channels = output_channels
+        self._pygame = None
+        self._reserved = 0
+
+    def open(self):
+        if self._pygame is not None:
+            return self._pygame
+        import pygame
+        # Le mixer est global à pygame : ne le rouvrir que s'il n'a pas déjà ce format,
+        # et sans laisser SDL changer la fréquence ou les canaux demandés
+        wanted = (self.sample_rate, -16, self.output_channels)
+        if pygame.mixer.get_init() != wanted:
+            pygame.mixer.quit()
+            pygame.mixer.init(frequency=self.sample_rate, size=-16, channels=self.output_channels,
+                              allowedchanges=0)
+        # Nombre de voix jouables en même temps
+        pygame.mixer.set_num_channels(self.channels)
+        self._pygame = pygame
+        return pygame
+
+    def make_sound(self, samples, volume=1.0):
+        sound = self.open().sndarray.make_sound(samples)
+        sound.set_volume(volume)
+        return sound
+
+    def find_channel(self):
+        # Vole le canal le plus ancien si tout est pris
+        return self.open().mixer.find_channel(True)
+
+    def reserve_channel(self):
+        # Canal hors de find_channel (séquenceur, flux)
+        pygame = self.open()
+        self._reserved += 1
+        pygame.mixer.set_reserved(self._reserved)
+        return pygame.mixer.Channel(self._reserved - 1)
+
+    def stop(self):
+        if self._pygame is not None:
+            self._pygame.mixer.stop()
+
+    def close(self):
+        pass
+
+
+class NullSound:
+    def __init__(self, samples, volume, sample_rate):
+        self.samples = np.array(samples)  # copie, comme make_sound
+        self.volume = volume
+        self.length = len(self.samples) / sample_rate
+
+    def get_length(self):
+        return self.length
+
+
+class NullChannel:
+    # Canal simulé sur l'horloge : un son occupe le canal pendant sa durée réelle,
+    # le son en file démarre exactement à la fin du précédent
+
+    def __init__(self, sink):
+        self.sink = sink
+        self._sound = None
+        self._end = 0.0
+        self._queued = None
+
+    def _update(self):
+        now = time.perf_counter()
+        while self._sound is not None and now >= self._end:
+            if self._queued is not None:
+                self._start(self._queued, self._end)
+                self._queued = None
+            else:
+                self._sound = None
+
+    def _start(self, sound, when):
+        self._sound = sound
+        self._end = when + sound.length
+        self.sink._emit(sound, when)
+
+    def play(self, sound):
+        self._queued = None
+        self._start(sound, time.perf_counter())
+
+    def queue(self, sound):
+        self._update()
+        if self._sound is None:
+            self._start(sound, time.perf_counter())
+        else:
+            self._queued = sound
+
+    def get_busy(self):
+        self._update()
+        return self._sound is not None
+
+    def get_sound(self):
+        self._update()
+        return self._sound
+
+    def get_queue(self):
+        self._update()
+        return self._queued
+
+    def stop(self):
+        self._sound = None
+        self._queued = None
+
+
+class NullSink:
+    # Aucune sortie : compte les sons, les échantillons et le temps passé à les préparer
+
+    def __init__(self, sample_rate=44100, channels=8, output_channels=2):
+        self.sample_rate = sample_rate
+        self.output_channels = output_channels
+        self._channels = [NullChannel(self) for _ in range(channels)]
+        self._reserved = 0
+        self.sounds_made = 0
+        self.make_seconds = 0.0
+        self.sounds_played = 0
+        self.samples_played = 0
+        self.first_play = None
+        self.last_play = None
+
+    def make_sound(self, samples, volume=1.0):
+        t0 = time.perf_counter()
+        sound = NullSound(samples, volume, self.sample_rate)
+        self.make_seconds += time.perf_counter() - t0
+        self.sounds_made += 1
+        return sound
+
+    def open(self):
+        pass
+
+    def find_channel(self):
+        free = self._channels[self._reserved:]
+        for channel in free:
+            if not channel.get_busy():
+                return channel
+        # Tout est pris : le canal qui finit le plus tôt
+        return min(free, key=lambda channel: channel._end) if free else None
+
+    def reserve_channel(self):
+        self._reserved += 1
+        return self._channels[self._reserved - 1]
+
+    def stop(self):
+        for channel in self._channels:
+            channel.stop()
+
+    def close(self):
+        pass
+
+    def _emit(self, sound, when):
+        # Appelé au démarrage effectif de chaque son
+        self.sounds_played += 1
+        self.samples_played += len(sound.samples)
+        if self.first_play is None:
+            self.first_play = when
+        self.last_play = when
+
+    def stats(self):
+        return {
+            "sounds_made": self.sounds_made,
+            "make_ms": self.make_seconds * 1000,
+            "sounds_played": self.sounds_played,
+            "samples_played": self.samples_played,
+            "audio_seconds": self.samples_played / self.sample_rate,
+        }
+
+
+class WavSink(NullSink):
+    # Comme NullSink, mais mixe tout ce qui est joué à sa position dans le temps et
+    # l'écrit dans un fichier WAV à la fermeture
+
+    def __init__(self, path, sample_rate=44100, channels=8, output_channels=2):
+        super().__init__(sample_rate, channels, output_channels)
+        self.path = path
+        self._t0 = None
+        self._mix = np.zeros((0, output_channels), dtype=np.int32)
+
+    def _emit(self, sound, when):
+        super()._emit(sound, when)
+        if self._t0 is None:
+            self._t0 = when
+        start = int(round((when - self._t0) * self.sample_rate))
+        samples = sound.samples * sound.volume
+        end = start + len(samples)
+        if end > len(self._mix):
+            # Croissance géométrique pour ne pas recopier à chaque note
+            grown = np.zeros((max(end, 2 * len(self._mix)), self.output_channels), dtype=np.int32)
+            grown[:len(self._mix)] = self._mix
+            self._mix = grown
+        self._mix[start:end] += samples.astype(np.int32).reshape(len(samples), -1)
+
+    def close(self):
+        length = int(round((self.last_play - self._t0) * self.sample_rate)) if self._t0 is not None else 0
+        used = np.flatnonzero(self._mix.any(axis=1))
+        length = max(length, used[-1] + 1 if len(used) else 0)
+        out = np.clip(self._mix[:length], -32768, 32767).astype("<i2")
+        with wave.open(self.path, "wb") as f:
+            f.setnchannels(self.output_channels)
+            f.setsampwidth(2)
+            f.setframerate(self.sample_rate)
+            f.writeframes(out.tobytes())
+
+
+def make_sink(name, sample_rate=44100, channels=8, path="session.wav", output_channels=2):
+    if name == "null":
+        return NullSink(sample_rate, channels, output_channels)
+    if name == "wav":
+        return WavSink(path, sample_rate, channels, output_channels)
+    return PygameSink(sample_rate, channels, output_channels)
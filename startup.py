@@ -0,0 +1,84 @@
+import importlib
+import json
+import os
+import sys
+import time
+
+from PyQt5.QtCore import QThread
+
+from gui.instruments.synth import INSTRUMENTS
+
+
+def _process_age():
+    # Secondes depuis le lancement du processus (Linux : /proc), 0 ailleurs
+    try:
+        with open("/proc/self/stat") as f:
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return max(0.0, uptime - start_ticks / os.sysconf("SC_CLK_TCK"))
+    except (OSError, ValueError, IndexError):
+        return 0.0
+
+
+class StartupProfile:
+    # Jalons du démarrage en ms depuis le lancement du processus, et durée des imports lourds
+
+    def __init__(self):
+        self.t0 = time.perf_counter() - _process_age()
+        self.marks = {}
+        self.imports = {}
+
+    def mark(self, name):
+        # Seule la première fois compte (premier affichage, première note…)
+        if name not in self.marks:
+            self.marks[name] = (time.perf_counter() - self.t0) * 1000
+
+    def timed_import(self, module):
+        t0 = time.perf_counter()
+        importlib.import_module(module)
+        self.imports.setdefault(module, (time.perf_counter() - t0) * 1000)
+
+    def report(self):
+        return {
+            "marks_ms": dict(sorted(self.marks.items(), key=lambda item: item[1])),
+            "imports_ms": dict(self.imports),
+        }
+
+    def write(self, path):
+        # "-" : résumé lisible sur stderr, sinon JSON
+        if path == "-":
+            for name, ms in self.report()["marks_ms"].items():
+                print(f"{name:20s} {ms:8.0f} ms", file=sys.stderr)
+            for module, ms in self.imports.items():
+                print(f"import {module:13s} {ms:8.0f} ms", file=sys.stderr)
+            return
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, indent=2)
+
+
+def warm_up(player, profile, modules=(), frequencies=()):
+    # Ce que la première note paierait sinon : imports, filtres du xylophone, tables d'harmoniques
+    for module in modules:
+        profile.timed_import(module)
+    player.resonators.prime(frequencies)
+    for instrument in INSTRUMENTS:
+        player.render_tone(instrument, 440.0, 0.01)
+
+
+class WarmUpWorker(QThread):
+    # warm_up() en arrière-plan, une fois la fenêtre affichée
+
+    def __init__(self, player, profile, modules=(), frequencies=(), parent=None):
+        super().__init__(parent)
+        self.player = player
+        self.profile = profile
+        self.modules = modules
+        self.frequencies = list(frequencies)
+
+    def run(self):
+        warm_up(self.player, self.profile, self.modules, self.frequencies)
+
+
+# Créé à l'import de main.py, le plus tôt possible
+startup_profile = StartupProfile()
@@ -0,0 +1,98 @@
+import threading
+from collections import deque
+
+import numpy as np
+
+
+class VoiceMixer:
+    # Somme des voix actives dans un bloc de taille fixe, tampons réutilisés
+
+    def __init__(self, block_size=1024, max_voices=32, gain=0.05, channels=2):
+        self.block_size = block_size
+        self.max_voices = max_voices
+        self.gain = gain
+        self._pending = deque()  # ajouté depuis le thread GUI
+        self._voices = []        # [tone, position], uniquement dans le thread audio
+        self._clear = False
+        self._mix = np.zeros(block_size, dtype=np.float32)
+        self._out = np.zeros((block_size, channels) if channels > 1 else block_size, dtype=np.int16)
+
+    def add(self, tone):
+        self._pending.append(tone)
+
+    def clear(self):
+        self._clear = True
+
+    @property
+    def active(self):
+        return len(self._voices) + len(self._pending)
+
+    def fill(self):
+        if self._clear:
+            self._clear = False
+            self._pending.clear()
+            self._voices.clear()
+        while self._pending:
+            self._voices.append([self._pending.popleft(), 0])
+        if len(self._voices) > self.max_voices:
+            # Vole les voix les plus anciennes
+            del self._voices[:len(self._voices) - self.max_voices]
+
+        mix = self._mix
+        mix.fill(0)
+        for voice in self._voices:
+            tone, pos = voice
+            n = min(self.block_size, len(tone) - pos)
+            mix[:n] += tone[pos:pos + n]
+            voice[1] = pos + n
+        self._voices = [voice for voice in self._voices if voice[1] < len(voice[0])]
+
+        np.multiply(mix, self.gain * 32767, out=mix)
+        np.clip(mix, -32767, 32767, out=mix)
+        if self._out.ndim == 1:
+            self._out[:] = mix
+        else:
+            self._out[:] = mix[:, None]
+        return self._out
+
+
+class StreamingBackend:
+    # Thread audio qui remplit un canal réservé bloc par bloc dès que sa file se libère
+
+    def __init__(self, channel, make_sound, block_size=1024, max_voices=32, gain=0.05, sample_rate=44100,
+                 channels=2):
+        self.channel = channel
+        self.make_sound = make_sound
+        self.mixer = VoiceMixer(block_size, max_voices, gain, channels)
+        self._period = block_size / sample_rate
+        self._wake = threading.Event()
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="audio-stream", daemon=True)
+        self._thread.start()
+
+    def play(self, tone):
+        self.mixer.add(tone)
+        self._wake.set()
+
+    def stop(self):
+        self.mixer.clear()
+        self.channel.stop()
+
+    def close(self):
+        self._running = False
+        self._wake.set()
+        self._thread.join()
+
+    def _run(self):
+        while self._running:
+            if not self.mixer.active:
+                # Rien à jouer : on dort jusqu'à la prochaine note
+                self._wake.wait()
+                self._wake.clear()
+                continue
+            if self.channel.get_queue() is None:
+                block = self.make_sound(self.mixer.fill())
+                self.channel.queue(block)
+            else:
+                self._wake.wait(self._period / 4)
+                self._wake.clear()
@@ -0,0 +1,277 @@
+from functools import lru_cache
+
+import numpy as np
+
+from gui.instruments.resonator import ResonatorBank
+
+# Instruments que sait rendre le synthétiseur, dans l'ordre des onglets de la fenêtre
+INSTRUMENTS = ("piano", "xylophone", "videogame")
+
+# Poids des harmoniques 1, 2, 3… de chaque instrument
+PIANO_HARMONICS = (0.5, 0.25, 0.1, 0.05, 0.025, 0.0125, 0.00625, 0.003125)
+XYLOPHONE_HARMONICS = (0.5, 0.4, 0.35, 0.3, 0.25, 0.2, 0.15, 0.1, 0.05, 0.03, 0.02, 0.01)
+
+# Une période échantillonnée ; l'interpolation linéaire reste sous le bit de poids faible en int16
+WAVETABLE_SIZE = 8192
+
+# Rendu groupé : sous cette longueur le coût Python par note domine et les notes
+# sont calculées ensemble, par paquets qui tiennent en cache
+BATCH_SHORT_NOTE = 2048
+BATCH_CHUNK = 65536
+
+
+@lru_cache(maxsize=None)
+def harmonic_table(weights, dtype="float64", size=WAVETABLE_SIZE):
+    # Somme des harmoniques sur une période, avec un point de garde pour l'interpolation
+    x = np.arange(size + 1) * (2 * np.pi / size)
+    harmonics = np.arange(1, len(weights) + 1)[:, None]
+    table = np.asarray(weights)[:, None] * np.sin(harmonics * x)
+    table = table.sum(axis=0).astype(dtype)
+    table.flags.writeable = False
+    return table
+
+
+def additive_tone(frequency, num_samples, sample_rate, weights, out=None, dtype=np.float64):
+    # Synthèse additive : lecture de la table par incrément de phase, dans out si fourni
+    dtype = np.dtype(dtype)
+    table = harmonic_table(tuple(weights), dtype.name)
+    if out is None:
+        out = np.empty(num_samples, dtype=dtype)
+
+    # Phase en float64 quel que soit dtype : la précision des notes longues en dépend
+    phase = np.arange(num_samples, dtype=np.float64)
+    phase *= frequency * WAVETABLE_SIZE / sample_rate
+    return _read_table(table, phase, out)
+
+
+def _read_table(table, phase, out):
+    # phase en points de table, modifiée sur place
+    np.mod(phase, WAVETABLE_SIZE, out=phase)
+    idx = phase.astype(np.intp)
+    phase -= idx
+
+    np.take(table, idx, out=out)
+    idx += 1
+    step = np.take(table, idx)
+    step -= out
+    step *= phase
+    out += step
+    return out
+
+
+class ToneBatch:
+    # Plusieurs notes rendues d'un coup, bout à bout dans un seul tampon
+
+    def __init__(self, samples, offsets, lengths):
+        self.samples = samples
+        self.offsets = offsets
+        self.lengths = lengths
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, i):
+        start = self.offsets[i]
+        return self.samples[start:start + self.lengths[i]]
+
+    def padded(self):
+        # Tableau 2-D (notes, échantillons), complété par des zéros
+        width = int(self.lengths.max()) if len(self) else 0
+        out = np.zeros((len(self), width), dtype=self.samples.dtype)
+        out[np.arange(width) < self.lengths[:, None]] = self.samples
+        return out
+
+
+# Réglage « quality » : (fréquence d'échantillonnage, canaux de sortie, précision des calculs)
+QUALITY_MODES = {
+    "low": (22050, 1, np.float32),
+    "standard": (44100, 2, np.float64),
+    "high": (48000, 2, np.float64),
+}
+
+
+class Synthesizer:
+    # Synthèse des notes en NumPy pur, sans mixer ni carte son
+
+    def __init__(self, sample_rate=44100, dtype=np.float64, output_channels=2):
+        self.sample_rate = sample_rate
+        # Précision des calculs : float64 ou float32
+        self.dtype = np.dtype(dtype)
+        # Sortie int16 mono (1) ou canal dupliqué (2)
+        self.output_channels = output_channels
+        # Filtres de résonance du xylophone, conçus une fois par fréquence
+        self.resonators = ResonatorBank(sample_rate)
+
+    def render_xylophone_tone(self, frequency, duration):
+        # Génération des harmoniques complexes pour un son métallique
+        tone = additive_tone(frequency, int(self.sample_rate * duration), self.sample_rate,
+                             XYLOPHONE_HARMONICS, dtype=self.dtype)
+        tone *= (0.5 * np.pi)
+
+        # Appliquer un filtre de résonance pour simuler la sonorité métallique
+        tone = self.resonators.voice(frequency).process(tone)
+
+        # Apply a quick decay envelope
+        envelope = np.linspace(1, 0, len(tone))
+        tone *= envelope
+
+        # Normalisation du ton (le filtre calcule en float64)
+        return (tone / np.max(np.abs(tone))).astype(self.dtype, copy=False)
+
+    def render_piano_tone(self, frequency, duration):
+        # Generate tone from the harmonic table
+        tone = additive_tone(frequency, int(self.sample_rate * duration), self.sample_rate,
+                             PIANO_HARMONICS, dtype=self.dtype)
+
+        # Ensure the envelope matches the length of the tone array
+        envelope = self.create_envelope(len(tone), attack_percent=0.01, decay_percent=0.1, sustain_level=0.3, release_percent=0.1)
+
+        # Apply envelope to the tone
+        tone *= envelope
+        return tone / np.max(np.abs(tone))  # Normalization
+
+    def create_envelope(self, num_samples, attack_percent, decay_percent, sustain_level, release_percent):
+        # Calculate lengths of each part of the ADSR envelope
+        attack_samples = int(num_samples * attack_percent)
+        decay_samples = int(num_samples * decay_percent)
+        sustain_samples = num_samples - (attack_samples + decay_samples + int(num_samples * release_percent))
+        release_samples = num_samples - (attack_samples + decay_samples + sustain_samples)
+
+        # Generate ADSR envelope
+        attack = np.linspace(0, 1, attack_samples, False)
+        decay = np.linspace(1, sustain_level, decay_samples, False)
+        sustain = np.full(sustain_samples, sustain_level)
+        release = np.linspace(sustain_level, 0, release_samples, False)
+        envelope = np.concatenate((attack, decay, sustain, release))
+        
+        # Ensure the envelope is not longer than the number of samples
+        return envelope[:num_samples]
+
+    def render_videoGame_tone(self, frequency, duration):
+        # Onde carrée pour la guitare
+        t = np.linspace(0, duration, int(self.sample_rate * duration), False)
+        return np.sign(np.sin(frequency * 2 * np.pi * t)).astype(self.dtype, copy=False)
+
+    def render_tone(self, instrument, frequency, duration):
+        render = {
+            "piano": self.render_piano_tone,
+            "xylophone": self.render_xylophone_tone,
+            "videogame": self.render_videoGame_tone,
+        }[instrument]
+        return render(frequency, duration)
+
+    def render_batch(self, instrument, frequencies, durations):
+        # Même rendu que render_tone pour toutes les notes, bout à bout dans un seul tampon
+        frequencies, durations = np.broadcast_arrays(
+            np.asarray(frequencies, dtype=np.float64).ravel(),
+            np.asarray(durations, dtype=np.float64).ravel())
+        lengths = (self.sample_rate * durations).astype(np.int64)
+        offsets = np.zeros(len(lengths), dtype=np.int64)
+        np.cumsum(lengths[:-1], out=offsets[1:])
+        samples = np.empty(int(lengths.sum()), dtype=self.dtype)
+
+        # Notes courtes : une passe NumPy par paquet
+        short = np.flatnonzero(lengths < BATCH_SHORT_NOTE)
+        ends = np.cumsum(lengths[short])
+        start = 0
+        while start < len(short):
+            base = ends[start - 1] if start else 0
+            stop = max(start + 1, int(np.searchsorted(ends, base + BATCH_CHUNK, side="right")))
+            notes = short[start:stop]
+            chunk = self._broadcast_batch(instrument, frequencies[notes], durations[notes])
+            first, last = notes[0], notes[-1]
+            if stop - start == last - first + 1:
+                samples[offsets[first]:offsets[last] + lengths[last]] = chunk.samples
+            else:
+                samples[np.repeat(np.isin(np.arange(len(lengths)), notes), lengths)] = chunk.samples
+            start = stop
+
+        # Notes longues : le noyau par note, qui reste en cache, est plus rapide
+        for i in np.flatnonzero(lengths >= BATCH_SHORT_NOTE):
+            samples[offsets[i]:offsets[i] + lengths[i]] = self.render_tone(instrument, frequencies[i], durations[i])
+        return ToneBatch(samples, offsets, lengths)
+
+    def _broadcast_batch(self, instrument, frequencies, durations):
+        sr = self.sample_rate
+        lengths = (sr * durations).astype(np.int64)
+        offsets = np.zeros(len(lengths), dtype=np.int64)
+        np.cumsum(lengths[:-1], out=offsets[1:])
+        total = int(lengths.sum())
+
+        # Position de chaque échantillon dans sa note
+        local = np.arange(total, dtype=np.float64)
+        local -= np.repeat(offsets.astype(np.float64), lengths)
+
+        if instrument == "videogame":
+            # t comme np.linspace(0, durée, n, False), puis les mêmes opérations que render_videoGame_tone
+            with np.errstate(invalid="ignore", divide="ignore"):
+                local *= np.repeat(durations / lengths, lengths)
+            local *= np.repeat(frequencies * 2 * np.pi, lengths)
+            tone = np.sign(np.sin(local)).astype(self.dtype)
+            return ToneBatch(tone, offsets, lengths)
+
+        weights = PIANO_HARMONICS if instrument == "piano" else XYLOPHONE_HARMONICS
+        table = harmonic_table(weights, self.dtype.name)
+        local *= np.repeat(frequencies * (WAVETABLE_SIZE / sr), lengths)
+        tone = _read_table(table, local, np.empty(total, dtype=self.dtype))
+
+        if instrument == "piano":
+            tone *= self._batch_envelope(offsets, lengths, total, 0.01, 0.1, 0.3, 0.1)
+        else:
+            tone *= (0.5 * np.pi)
+            tone = self._batch_resonate(tone, frequencies, offsets, lengths)
+            # Décroissance linéaire de 1 à 0 sur chaque note
+            tone *= self._batch_ramps(offsets, [(0, 1.0), (lengths - 1, 0.0)], total)
+
+        # Normalisation note par note
+        played = lengths > 0
+        peaks = np.ones(len(lengths))
+        if played.any():
+            peaks[played] = np.maximum.reduceat(np.abs(tone), offsets[played])
+        peaks[peaks == 0] = 1
+        tone /= np.repeat(peaks, lengths)
+        return ToneBatch(tone, offsets, lengths)
+
+    def _batch_envelope(self, offsets, lengths, total, attack_percent, decay_percent, sustain_level, release_percent):
+        # create_envelope pour toutes les notes à la fois : segments linéaires entre points d'appui
+        attack = (lengths * attack_percent).astype(np.int64)
+        decay = (lengths * decay_percent).astype(np.int64)
+        sustain = lengths - (attack + decay + (lengths * release_percent).astype(np.int64))
+        return self._batch_ramps(offsets, [
+            (0, 0.0),
+            (attack, 1.0),
+            (attack + decay, sustain_level),
+            (attack + decay + sustain, sustain_level),
+            (lengths, 0.0),
+        ], total)
+
+    @staticmethod
+    def _batch_ramps(offsets, points, total):
+        # points : (position dans la note, valeur) ; à position égale, le dernier point l'emporte
+        xp = np.stack([np.broadcast_to(offsets + x, offsets.shape) for x, _ in points], axis=1).ravel()
+        fp = np.tile([value for _, value in points], len(offsets))
+        return np.interp(np.arange(total, dtype=np.float64), xp, fp)
+
+    def _batch_resonate(self, tone, frequencies, offsets, lengths):
+        # Un lfilter 2-D par fréquence distincte, sur les notes alignées à gauche
+        from scipy.signal import lfilter
+        tone = tone.astype(np.float64)
+        played = lengths > 0
+        for frequency in np.unique(frequencies[played]):
+            rows = (frequencies == frequency) & played
+            selected = np.repeat(rows, lengths)
+            width = int(lengths[rows].max())
+            cells = np.arange(width) < lengths[rows][:, None]
+            block = np.zeros((int(rows.sum()), width))
+            block[cells] = tone[selected]
+            b, a, zi = self.resonators.coefficients(frequency)
+            block, _ = lfilter(b, a, block, axis=1, zi=zi[None, :] * block[:, :1])
+            tone[selected] = block[cells]
+        return tone
+
+    def to_samples(self, tone):
+        # Écrêté avant la conversion : un mélange au-delà de ±1 ne doit pas reboucler en int16
+        samples = (32767 * np.clip(tone, -1.0, 1.0)).astype(np.int16)
+        if self.output_channels == 1:
+            return samples
+        return np.repeat(samples[:, None], self.output_channels, axis=1)
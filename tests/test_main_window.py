@@ -0,0 +1,47 @@
+import os
+from unittest import mock
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("IHM_AUDIO_SINK", "null")
+pytest.importorskip("PyQt5")
+
+from PyQt5.QtCore import QSettings  # noqa: E402
+from PyQt5.QtWidgets import QApplication  # noqa: E402
+
+# Une seule application pour tout le module : la détruire emporterait les QSettings de config
+app = QApplication.instance() or QApplication([])
+
+
+@pytest.fixture
+def window(tmp_path):
+    # Réglages dans un dossier temporaire : le test ne touche pas ceux de l'utilisateur
+    for fmt in (QSettings.NativeFormat, QSettings.IniFormat):
+        QSettings.setPath(fmt, QSettings.UserScope, str(tmp_path))
+    from gui.instruments.main import MainWindow
+    window = MainWindow()
+    window.show()
+    app.processEvents()
+    yield window
+    window.close()
+
+
+def test_quit_closes_the_audio_sink(window):
+    with mock.patch.object(window.player, "close") as close:
+        window.quitAction.trigger()
+    close.assert_called_once()
+
+
+def test_quit_while_recording_keeps_the_notes(window, tmp_path):
+    from gui.instruments import main
+
+    path = tmp_path / "session.txt"
+    window.switch_instrument(0)
+    with mock.patch.object(main.QFileDialog, "getSaveFileName", return_value=(str(path), "")):
+        window.start_recording()
+    window.piano.notePlayed.emit("Do", 0.0)
+    window.quitAction.trigger()
+    assert not window.recording
+    assert path.read_text(encoding="utf-8").split() == ["Do", "%.4f" % window.click_durations["piano"]]
@@ -0,0 +1,49 @@
+import struct
+
+import numpy as np
+import pytest
+
+from gui.instruments.midi import midi_bytes, read_midi
+from gui.instruments.partition import Partition
+
+
+def _file(track_events, division=480):
+    body = b"".join(track_events) + b"\x00\xFF\x2F\x00"
+    return (b"MThd" + struct.pack(">IHHH", 6, 0, 1, division)
+            + b"MTrk" + struct.pack(">I", len(body)) + body)
+
+
+def test_file_without_tempo_defaults_to_120_bpm():
+    # Une noire (480 ticks) à 120 noires par minute : 0,5 s
+    data = _file([b"\x00\x90\x3C\x64", b"\x83\x60\x80\x3C\x00"])
+    partition = read_midi(data)
+    assert partition.names == ["C4"]
+    assert np.allclose(partition.onset, [0.0])
+    assert np.allclose(partition.duration, [0.5])
+
+
+def test_round_trip_keeps_chords():
+    partition = Partition(["C4", "E4", "G4"], [0, 1, 2], [1.0, 1.0, 0.5], [0.0, 0.0, 0.0])
+    back = read_midi(midi_bytes(partition))
+    assert sorted(back.names) == ["C4", "E4", "G4"]
+    assert np.allclose(back.onset, 0.0)
+    assert np.isclose(back.length, 1.0)
+
+
+def test_truncated_file_is_a_value_error():
+    data = _file([b"\x00\x90\x3C\x64", b"\x83\x60\x80\x3C\x00"])
+    # En-tête incomplet, puis un note-off coupé en deux
+    for size in (4, 10, 28):
+        with pytest.raises(ValueError):
+            read_midi(data[:size])
+
+
+def test_chords_are_scaled_by_polyphony():
+    from gui.instruments.render import INSTRUMENTS, render_partition
+    from gui.instruments.synth import Synthesizer
+
+    chord = Partition(["C4", "E4", "G4", "C5"], [0, 1, 2, 3], [0.5] * 4, [0.0] * 4)
+    assert chord.polyphony() == 4
+    synth = Synthesizer(22050)
+    for instrument in INSTRUMENTS:
+        assert np.abs(render_partition(chord, instrument, synth=synth)).max() <= 1.0 + 1e-6
@@ -0,0 +1,43 @@
+import numpy as np
+
+from gui.instruments.partition import PartitionWriter, load_binary, load_partition, main, parse_partition
+
+
+def test_polyphony_of_a_sequential_partition_is_one():
+    partition = parse_partition(["Do 0.1", "0 0.3", "Ré 0.2", "Mi 0.7", "Fa 0.05"])
+    assert partition.polyphony() == 1
+
+
+def test_polyphony_of_rests_only_is_zero():
+    assert parse_partition(["0 1.0", "R 0.5"]).polyphony() == 0
+
+
+def _assert_same(a, b):
+    assert [a.names[i] for i in a.note_ids] == [b.names[i] for i in b.note_ids]
+    np.testing.assert_array_equal(a.onset, b.onset)
+    np.testing.assert_array_equal(a.duration, b.duration)
+
+
+def test_text_to_binary_round_trip(tmp_path):
+    source = tmp_path / "air.txt"
+    source.write_text("Do 0.25\n0 0.5\nRé# 0.125\nDo 1.0\nLab\n", encoding="utf-8")
+    main([str(source)])
+    text = load_partition(str(source))
+    binary = load_partition(str(tmp_path / "air.ihmp"))
+    assert len(binary) == 5
+    _assert_same(text, binary)
+
+
+def test_partially_flushed_writer_still_loads(tmp_path):
+    path = str(tmp_path / "prise.ihmp")
+    writer = PartitionWriter(path)
+    for note, duration in [("La", 0.5), ("0", 0.25), ("Si", 0.75)]:
+        writer.write(note, duration)
+    writer.flush()
+    # Notes écrites après le dernier flush : l'en-tête ne les compte pas encore
+    writer.write("Do", 1.0)
+    writer._f.flush()
+    partition = load_binary(path)
+    _assert_same(partition, parse_partition(["La 0.5", "0 0.25", "Si 0.75"]))
+    writer.close()
+    _assert_same(load_binary(path), parse_partition(["La 0.5", "0 0.25", "Si 0.75", "Do 1.0"]))
@@ -0,0 +1,44 @@
+import pytest
+
+from gui.instruments.pitch import REST, note_frequency, note_index
+
+
+@pytest.mark.parametrize("note, index", [
+    ("A4", 69),
+    ("C4", 60),
+    ("C#4", 61),
+    ("Db4", 61),
+    ("Bb3", 58),
+    ("E#4", 65),
+    ("Fb4", 64),
+    ("Cb4", 59),
+    ("B#3", 60),
+    ("B#4", 72),
+    ("C-1", 0),
+    ("G9", 127),
+])
+def test_english_names(note, index):
+    assert note_index(note) == index
+
+
+@pytest.mark.parametrize("note, octave, index", [
+    ("Do", 1, 60),
+    ("Ré#", 1, 63),
+    ("Sib", 1, 70),
+    ("Dob", 1, 59),
+    ("Si#", 1, 72),
+    ("Do", 3, 84),
+])
+def test_solfege_names(note, octave, index):
+    assert note_index(note, octave) == index
+
+
+@pytest.mark.parametrize("note", ["Cb-1", "G#9", "B#9", "H4", "0"])
+def test_out_of_range_and_unknown_names(note):
+    assert note_index(note) == REST
+    assert note_frequency(note) is None
+
+
+def test_enharmonics_share_a_frequency():
+    assert note_frequency("Cb4") == note_frequency("B3")
+    assert note_frequency("B#3") == note_frequency("C4")
@@ -0,0 +1,106 @@
+import types
+
+import numpy as np
+import pytest
+
+from gui.instruments import sequencer as sequencer_module
+from gui.instruments.instrument import MusicPlayer
+from gui.instruments.partition import Partition
+from gui.instruments.sequencer import Sequencer
+from gui.instruments.sinks import NullSink
+
+SR = 8000
+
+
+class Clock:
+    # Horloge du séquenceur avancée à la main
+    def __init__(self):
+        self.now = 100.0
+
+    def perf_counter(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(sequencer_module, "time", types.SimpleNamespace(perf_counter=clock.perf_counter))
+    return clock
+
+
+@pytest.fixture
+def sequencer():
+    player = MusicPlayer(SR, sink=NullSink(SR, 4, 1), dtype=np.float32, output_channels=1)
+    sequencer = Sequencer(player, block_seconds=0.25)
+    # Huit noires de 0,5 s : 4 s, une mesure par seconde
+    sequencer.load(Partition(["A4"], np.zeros(8), np.full(8, 0.5)), "piano")
+    return sequencer
+
+
+def test_position_follows_the_queued_block_between_pumps(sequencer, clock):
+    sequencer.start()
+    clock.now += 0.27
+    # Deux blocs envoyés : le second a commencé à 0,25 s sans pump()
+    assert sequencer.position_samples() == pytest.approx(0.27 * SR, abs=1)
+
+
+def test_pause_and_resume_at_the_same_sample(sequencer, clock):
+    sequencer.start()
+    clock.now += 0.4
+    sequencer.pause()
+    paused = sequencer.position_samples()
+    assert paused == pytest.approx(0.4 * SR, abs=1)
+    clock.now += 1.0
+    assert sequencer.paused and sequencer.position_samples() == paused
+    sequencer.resume()
+    assert not sequencer.paused
+    assert sequencer._chunks[0][1][0][0] == paused
+    assert sequencer.position_samples() == paused
+
+
+def test_seek_clamps_to_the_partition(sequencer):
+    sequencer.seek(-3.0)
+    assert sequencer.position_samples() == 0
+    sequencer.seek(99.0)
+    assert sequencer.position_samples() == sequencer.total
+    sequencer.seek(1.5)
+    assert sequencer.position == pytest.approx(1.5)
+    assert sequencer.note_at() == 3
+
+
+def test_seek_bar_uses_bar_length_and_tempo(sequencer):
+    sequencer.load(Partition(["A4"], np.zeros(8), np.full(8, 0.5)), "piano", tempo_factor=2.0, bar_seconds=1.0)
+    sequencer.seek_bar(1)
+    assert sequencer.position == pytest.approx(0.5)
+    assert sequencer.bar_at() == 1
+
+
+def test_loop_wraps_inside_one_block(sequencer):
+    sequencer.set_loop(1.0, 1.1)
+    sequencer.seek(1.05)
+    segments = sequencer._next_segments()
+    # Fin de boucle puis retour en A, sans trou, jusqu'à remplir le bloc
+    assert segments[0] == (int(1.05 * SR), int(0.05 * SR))
+    assert segments[1] == (int(1.0 * SR), int(0.1 * SR))
+    assert sum(n for _, n in segments) == sequencer.block_size
+    assert all(int(1.0 * SR) <= start and start + n <= int(1.1 * SR) for start, n in segments)
+
+
+def test_set_loop_orders_clamps_and_ignores_empty(sequencer):
+    sequencer.set_loop(3.0, 1.0)
+    assert sequencer.loop == (1.0, 3.0)
+    sequencer.set_loop(2.0, 50.0)
+    assert sequencer.loop == (2.0, sequencer.duration)
+    sequencer.set_loop(2.0, 2.0)
+    assert sequencer.loop is None
+    sequencer.set_loop(1.0, 2.0)
+    sequencer.clear_loop()
+    assert sequencer.loop is None
+
+
+def test_set_loop_during_playback_requeues_past_b(sequencer, clock):
+    sequencer.start()
+    clock.now += 0.3
+    # B à 0,35 s : déjà dans les blocs envoyés (jusqu'à 0,5 s), qui sont refaits
+    sequencer.set_loop(0.1, 0.35)
+    assert all(start + n <= int(0.35 * SR) for _, segments in sequencer._chunks for start, n in segments)
@@ -0,0 +1,70 @@
+from collections import OrderedDict
+
+
+class ToneCache:
+    # Cache LRU des notes synthétisées : clé -> (échantillons int16, pygame.mixer.Sound)
+    # Borné en nombre d'entrées et en mémoire occupée.
+
+    def __init__(self, max_entries=256, max_bytes=32 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self.nbytes = 0
+
+        # Compteurs
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key, samples, sound=None):
+        if key in self._entries:
+            self._discard(key)
+        size = self._entry_size(samples, sound)
+        if size > self.max_bytes:
+            # Trop gros pour être gardé, inutile de vider le cache pour lui
+            return
+        self._entries[key] = (samples, sound)
+        self.nbytes += size
+        while len(self._entries) > self.max_entries or self.nbytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._discard(oldest)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+        self.nbytes = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.nbytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def _discard(self, key):
+        samples, sound = self._entries.pop(key)
+        self.nbytes -= self._entry_size(samples, sound)
+
+    @staticmethod
+    def _entry_size(samples, sound):
+        # Le Sound garde sa propre copie du tampon
+        return samples.nbytes * (2 if sound is not None else 1)
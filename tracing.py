@@ -0,0 +1,117 @@
+import json
+import os
+import time
+from collections import deque
+
+import numpy as np
+
+from config import settings
+
+
+class NoteTrace:
+    # Horodatages (perf_counter_ns) des étapes d'une note, de l'entrée jusqu'au son
+
+    __slots__ = ("id", "label", "marks")
+
+    def __init__(self, trace_id, label, stage):
+        self.id = trace_id
+        self.label = label
+        self.marks = [(stage, time.perf_counter_ns())]
+
+
+class NoteTracer:
+    # Traçage facultatif du chemin d'une note : touche -> clic -> minuterie -> synthèse -> son.
+    # Désactivé, chaque point de mesure se réduit à un test sur None.
+
+    def __init__(self, enabled=False, window=512, keep=4096):
+        self.enabled = enabled
+        self.window = window
+        # Note lancée au clavier, en attente du clic du bouton
+        self.pending = None
+        # Note en cours dans le lecteur (MusicPlayer)
+        self.active = None
+        self.stages = {}
+        self.totals = deque(maxlen=window)
+        self.finished = deque(maxlen=keep)
+        self._next_id = 0
+
+    def _new(self, label, stage):
+        self._next_id += 1
+        return NoteTrace(self._next_id, label, stage)
+
+    def begin(self, label):
+        # Côté fenêtre : touche du clavier reçue
+        if self.enabled:
+            self.pending = self._new(label, "key")
+        return self.pending
+
+    def claim(self, label):
+        # Côté widget : reprend la note lancée au clavier, sinon en commence une (clic souris)
+        trace, self.pending = self.pending, None
+        if trace is None:
+            return self._new(label, "click") if self.enabled else None
+        self.mark(trace, "click")
+        return trace
+
+    def discard(self):
+        # Appui fusionné avec le précédent : pas de note, donc pas de trace
+        self.pending = None
+
+    @staticmethod
+    def mark(trace, stage):
+        if trace is not None:
+            trace.marks.append((stage, time.perf_counter_ns()))
+
+    def finish(self, trace):
+        self.active = None
+        if trace is None:
+            return
+        previous = trace.marks[0][1]
+        for stage, ns in trace.marks[1:]:
+            window = self.stages.get(stage)
+            if window is None:
+                window = self.stages[stage] = deque(maxlen=self.window)
+            window.append(ns - previous)
+            previous = ns
+        self.totals.append(previous - trace.marks[0][1])
+        self.finished.append(trace)
+
+    def percentiles(self, percents=(50, 90, 99)):
+        # Centiles glissants (ms) sur les dernières notes, par étape et de bout en bout
+        def summarize(samples):
+            values = np.percentile(np.fromiter(samples, np.int64, len(samples)), percents) / 1e6
+            return dict(zip(("p%d" % p for p in percents), values.tolist()))
+
+        report = {stage: summarize(samples) for stage, samples in self.stages.items() if samples}
+        if self.totals:
+            report["total"] = summarize(self.totals)
+        return report
+
+    def reset(self):
+        self.pending = None
+        self.active = None
+        self.stages.clear()
+        self.totals.clear()
+        self.finished.clear()
+
+    def export_chrome_trace(self, path):
+        # Format « Trace Event » lisible par chrome://tracing et Perfetto : une ligne par note
+        events = []
+        pid = os.getpid()
+        for trace in self.finished:
+            start = trace.marks[0][1]
+            end = trace.marks[-1][1]
+            events.append({"name": trace.label, "cat": "note", "ph": "X", "pid": pid, "tid": trace.id,
+                           "ts": start / 1000, "dur": (end - start) / 1000})
+            previous = start
+            for stage, ns in trace.marks[1:]:
+                events.append({"name": stage, "cat": "stage", "ph": "X", "pid": pid, "tid": trace.id,
+                               "ts": previous / 1000, "dur": (ns - previous) / 1000})
+                previous = ns
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        return len(self.finished)
+
+
+# Actif avec le réglage trace_notes ou la variable d'environnement IHM_TRACE=1
+tracer = NoteTracer(os.environ.get("IHM_TRACE") == "1" or settings.value("trace_notes", False, type=bool))
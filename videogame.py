@@ -1,19 +1,22 @@
 import time
 
-from PyQt5.QtCore import pyqtSignal, QSize, QTimer, QPropertyAnimation, QEasingCurve
+from PyQt5.QtCore import pyqtSignal, QSize, QTimer, QPropertyAnimation, QEasingCurve, QAbstractAnimation
 from PyQt5.QtGui import QIcon
 from PyQt5.QtWidgets import QWidget, QPushButton, QHBoxLayout
 
 from config import settings
-from gui.instruments.instrument import MusicPlayer
+from gui.instruments.instrument import shared_player
+from gui.instruments.keyboard import RepeatFilter
+from gui.instruments.pitch import note_frequency
+from gui.instruments.tracing import tracer
 
 
 class VideoGame(QWidget):
     notePlayed = pyqtSignal(str, float)
 
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, player=None):
         super().__init__(parent)
-        self.player = MusicPlayer()
+        self.player = player if player is not None else shared_player()
         self.click_duration = float(settings.value("click_videogame", 0.1))
 
         # Game pad buttons and identifiers
@@ -32,21 +35,16 @@ class VideoGame(QWidget):
 
         # Corresponding frequencies for each button
         self.frequencies = [
-            2093,  # C7
-            2349,  # D7
-            2637,  # E7
-            2794,  # F7
-            3136,  # G7
-            3520,  # A7
-            1976,  # B6
-            1568,  # G6
-            1760,  # A6
-            1318,  # E6
+            note_frequency(name)
+            for name in ("C7", "D7", "E7", "F7", "G7", "A7", "B6", "G6", "A6", "E6")
         ]
 
         self.icon_size = QSize(64, 64)
         self.anim_duration = 150  # ms
 
+        # Presses of the same pad closer than repeat_ms play a single note
+        self.repeats = RepeatFilter()
+
         self._build_ui()
 
     def _build_ui(self):
@@ -60,7 +58,9 @@ class VideoGame(QWidget):
         main_layout.setContentsMargins(0, 0, 0, 0)
         main_layout.setSpacing(10)
 
-        # Create icon buttons
+        # Create icon buttons, each with one press animation reused for every click
+        self.pad_buttons = []
+        self.pad_animations = []
         for idx, (filename, identifier) in enumerate(self.buttons):
             btn = QPushButton()
             btn.setIcon(QIcon(f"icons/{filename}"))
@@ -70,26 +70,42 @@ class VideoGame(QWidget):
             btn.setFlat(True)
             btn.clicked.connect(self._make_play_fn(idx, identifier, btn))
             main_layout.addWidget(btn)
+            self.pad_buttons.append(btn)
+            anim = QPropertyAnimation(btn, b"geometry", btn)
+            anim.setDuration(self.anim_duration)
+            anim.setEasingCurve(QEasingCurve.InOutQuad)
+            self.pad_animations.append(anim)
 
         self.setLayout(main_layout)
 
+    def playable_tones(self):
+        return [("videogame", freq, self.click_duration) for freq in self.frequencies]
+
     def _make_play_fn(self, idx, identifier, button):
         def handler():
-            # Button press animation
-            orig = button.geometry()
-            shrink = orig.adjusted(2, 2, -2, -2)
-            anim = QPropertyAnimation(button, b"geometry", self)
-            anim.setDuration(self.anim_duration)
-            anim.setEasingCurve(QEasingCurve.InOutQuad)
-            anim.setKeyValueAt(0, orig)
-            anim.setKeyValueAt(0.5, shrink)
-            anim.setKeyValueAt(1, orig)
+            trace = tracer.claim(identifier)
+
+            # Restart the pad's own animation, from its resting geometry even mid-press
+            anim = self.pad_animations[idx]
+            if anim.state() != QAbstractAnimation.Running:
+                orig = button.geometry()
+                anim.setKeyValueAt(0, orig)
+                anim.setKeyValueAt(0.5, orig.adjusted(2, 2, -2, -2))
+                anim.setKeyValueAt(1, orig)
+            anim.stop()
             anim.start()
 
+            # Rapid repeats of the same pad: one note
+            if self.repeats.repeated(idx):
+                return
+
             # Play tone after half animation
             def play_note():
                 freq = self.frequencies[idx]
+                tracer.mark(trace, "timer")
+                tracer.active = trace
                 self.player.play_videoGame_tone(freq, self.click_duration)
+                tracer.finish(trace)
                 self.notePlayed.emit(identifier, time.time())
 
             QTimer.singleShot(self.anim_duration // 2, play_note)
@@ -1,18 +1,20 @@
 import time
 
-from PyQt5.QtCore import pyqtSignal, QTimer, QSize
-from PyQt5.QtWidgets import QWidget, QPushButton, QHBoxLayout
+from PyQt5.QtCore import pyqtSignal, QRect, QTimer
 
 from config import settings
-from gui.instruments.instrument import note_to_frequency, MusicPlayer
+from gui.instruments.instrument import shared_player
+from gui.instruments.keyboard import Key, KeyboardWidget, KeyStyle
+from gui.instruments.pitch import note_frequency
+from gui.instruments.tracing import tracer
 
 
-class Xylophone(QWidget):
+class Xylophone(KeyboardWidget):
     notePlayed = pyqtSignal(str, float)
 
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, player=None):
         super().__init__(parent)
-        self.player = MusicPlayer()
+        self.player = player if player is not None else shared_player()
         self.click_duration = float(settings.value("click_xylophone", 0.5))
 
         # Bar dimensions and spacing
@@ -26,52 +28,38 @@ class Xylophone(QWidget):
 
         # Press animation duration in ms
         self.anim_duration = 150
+        self.press_ms = self.anim_duration
 
+        self.keyPressed.connect(self._play_key)
         self._build_ui()
 
     def _build_ui(self):
-        # Clear any existing layout
-        old_layout = self.layout()
-        if old_layout:
-            QWidget().setLayout(old_layout)
-
-        # Horizontal layout for bars
-        layout = QHBoxLayout(self)
-        layout.setContentsMargins(0, 0, 0, 0)
-        layout.setSpacing(self.spacing)
-
-        # Create bars with press animation
+        # Bars side by side, centred vertically, each in its own colour
+        tallest = max(self.bar_heights)
+        self.bar_buttons = {}
         for idx, note in enumerate(self.notes):
-            btn = QPushButton(note)
-            btn.setFixedSize(self.bar_width, self.bar_heights[idx])
-            btn.setStyleSheet(
-                f"QPushButton {{ background: {self.colors[idx]}; border: none; border-radius: 10px; }}"
-                "QPushButton:pressed { background: #444; }"
-            )
-            btn.clicked.connect(self._make_play_fn(note, idx, btn))
-            layout.addWidget(btn)
-
-        self.setLayout(layout)
-
-    def sizeHint(self) -> QSize:
-        width = self.bar_width * len(self.notes) + self.spacing * (len(self.notes) - 1)
-        height = max(self.bar_heights)
-        return QSize(width, height)
-
-    def _make_play_fn(self, note, button):
-        def handler():
-            # Simulate press animation
-            button.setDown(True)
-            QTimer.singleShot(self.anim_duration, lambda: button.setDown(False))
-
-            # Play tone after half animation
-            def play_note():
-                freqs = note_to_frequency.get(note, [])
-                # Always use base octave for xylophone
-                freq = freqs[0] if freqs else 440
-                self.player.play_xylophone_tone(freq, self.click_duration)
-                self.notePlayed.emit(note, time.time())
-
-            QTimer.singleShot(self.anim_duration // 2, play_note)
-
-        return handler
+            height = self.bar_heights[idx]
+            rect = QRect(idx * (self.bar_width + self.spacing), (tallest - height) // 2, self.bar_width, height)
+            self.bar_buttons[note] = Key(note, note, rect, KeyStyle(self.colors[idx], "#444", radius=10))
+        self.set_keys([list(self.bar_buttons.values())])
+
+    def frequency(self, note):
+        # Always use base octave for xylophone
+        return note_frequency(note) or 440
+
+    def playable_tones(self):
+        return [("xylophone", self.frequency(note), self.click_duration) for note in self.notes]
+
+    def _play_key(self, note):
+        trace = tracer.claim(note)
+
+        # Play tone after half animation
+        def play_note():
+            freq = self.frequency(note)
+            tracer.mark(trace, "timer")
+            tracer.active = trace
+            self.player.play_xylophone_tone(freq, self.click_duration)
+            tracer.finish(trace)
+            self.notePlayed.emit(note, time.time())
+
+        QTimer.singleShot(self.anim_duration // 2, play_note)